@@ -0,0 +1,186 @@
+# classroom_server.py
+# Run the magnetometer experiment on every board in the room at once
+# The instructor calls out each distance, every station measures it
+# concurrently, and all trials go to one sample store tagged with the
+# board's serial number and the student at that station
+#
+#   python classroom_server.py --roster roster.csv --trials 3
+#
+# roster.csv has one "board serial,student" pair per line. Boards can also be
+# given as ports, e.g. the pseudo-terminals printed by
+#   python -m sim.pty_board "Lab 09 - Magnetometer/code.py" --boards 3
+# and then named in the roster by their port path.
+
+import adafruit_board_toolkit.circuitpython_serial
+import argparse
+import asyncio
+import csv
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from measure_field_strength import (
+    field_strength,
+    parse_distances,
+    prompt,
+    run_experiment,
+)
+from sample_store import open_store
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from analysis import open_port  # noqa: E402
+
+
+class Station:
+    # One board and the student using it
+    def __init__(self, device, serial_number, student=None):
+        self.device = device
+        self.serial_number = serial_number
+        self.student = student
+        self.port = None
+        self.failures = 0
+
+    @property
+    def name(self):
+        return self.student or self.serial_number
+
+
+def read_roster(path):
+    # Map board serial numbers (or port paths) to students
+    if path is None:
+        return {}
+    with open(path, newline="") as file:
+        return {row[0].strip(): row[1].strip() for row in csv.reader(file) if row}
+
+
+def discover_stations(ports, roster):
+    # Every attached CircuitPython data port, or just the ports given
+    if ports:
+        found = [(port, port) for port in ports]
+    else:
+        comports = adafruit_board_toolkit.circuitpython_serial.data_comports()
+        found = [(p.device, p.serial_number or p.device) for p in comports]
+    return [Station(device, serial, roster.get(serial)) for device, serial in found]
+
+
+def flush(station):
+    # Throw away anything a failed run left in the port, such as a late
+    # end-of-run frame
+    try:
+        station.port.reset_input_buffer()
+    except OSError:
+        pass
+
+
+async def measure_station(station, distance, args, store):
+    # Run every trial at one distance on one station
+    fields = []
+    for _ in range(args.trials):
+        try:
+            raw = await asyncio.to_thread(
+                run_experiment, station.port, args.samples, args.sensor_delay
+            )
+        except (OSError, TimeoutError) as error:
+            station.failures += 1
+            print(f"{station.name}: {error}; leaving it out from now on")
+            flush(station)
+            return fields
+        if len(raw) == 0:
+            print(f"{station.name}: no samples received")
+            continue
+        field = field_strength(raw)
+        # Appends happen on the event loop's thread, so stations never
+        # interleave their records
+        store.append(
+            distance,
+            field,
+            board=station.serial_number,
+            student=station.student,
+        )
+        fields.append(field)
+    return fields
+
+
+async def run_classroom(stations, args, store):
+    # One worker thread per station (plus one for the prompt), so every
+    # station measures at once; the default pool has only cpu_count + 4
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=len(stations) + 1)
+    )
+    for distance in args.distances:
+        action = await asyncio.to_thread(prompt, distance)
+        if action == "quit":
+            break
+        if action == "skip":
+            continue
+        # A station that failed once is left out, so a board that stopped
+        # answering doesn't hold up every later distance by its timeout
+        active = [s for s in stations if not s.failures]
+        if not active:
+            print("No stations left to measure with")
+            break
+        results = await asyncio.gather(
+            *(measure_station(s, distance, args, store) for s in active)
+        )
+        for station, fields in zip(active, results):
+            if fields:
+                mean = sum(f.mean() for f in fields) / len(fields)
+                print(f"{station.name:>20s}: {mean:8.2f} uT")
+            else:
+                print(f"{station.name:>20s}: no result")
+        print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure with every board at once")
+    parser.add_argument(
+        "--port",
+        action="append",
+        dest="ports",
+        help="data port to use instead of discovering boards (repeatable)",
+    )
+    parser.add_argument("--roster", type=Path, help="CSV of board serial,student")
+    parser.add_argument(
+        "--distances",
+        type=parse_distances,
+        default="all",
+        help='distances in cm, e.g. "4,6,10-14" (default: all, 2 to 22)',
+    )
+    parser.add_argument(
+        "--trials", type=int, default=1, help="runs at each distance per station"
+    )
+    parser.add_argument("--samples", type=int, default=25, help="samples in each run")
+    parser.add_argument(
+        "--sensor-delay",
+        type=float,
+        default=0,
+        help="minimum seconds between samples (0 reads as fast as possible)",
+    )
+    parser.add_argument(
+        "--store", type=Path, help="folder for the sample store (default: this lab)"
+    )
+    args = parser.parse_args()
+
+    if args.store:
+        args.store.mkdir(parents=True, exist_ok=True)
+    stations = discover_stations(args.ports, read_roster(args.roster))
+    if not stations:
+        print("No boards found")
+        return
+    for station in stations:
+        print(f"{station.device}: board {station.serial_number}, {station.student}")
+        station.port = open_port(station.device)
+    store = open_store(args.store)
+    try:
+        asyncio.run(run_classroom(stations, args, store))
+    finally:
+        for station in stations:
+            station.port.close()
+    print(f"Results saved to {store.path.name}")
+    for station in stations:
+        if station.failures:
+            print(f"{station.name}: left out after a failed run")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,72 +1,163 @@
 # measure_fields.py
 # Read magnetic field strength samples
-# Save readings to a JSON file
+# Save every trial to the lab's sample store (see sample_store.py)
+#
+# Measures every distance from 2 to 22 cm in one session by default:
+#   python measure_field_strength.py
+#   python measure_field_strength.py --distances 4,6,10-14 --trials 3
 
-import adafruit_board_toolkit.circuitpython_serial
-import serial
-import json
+import argparse
+import sys
 from pathlib import Path
-from pprint import pprint
+import numpy as np
+from sample_store import STORE_NAME, open_store
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from analysis import open_port, read_run  # noqa: E402
 
-# Open the USB data port
-cdc_data = adafruit_board_toolkit.circuitpython_serial.data_comports()[0]
-ser = serial.Serial(None, 115200, 8, "N", 1, timeout=120)
-ser.port = cdc_data.device
-ser.open()
+MIN_DISTANCE = 2
+MAX_DISTANCE = 22
 
 
-def usb_readline():
-    return ser.readline().decode("utf-8").strip()
-
-
-def usb_writeline(x):
+def usb_writeline(ser, x):
     ser.write(bytes(str(x) + "\n", "utf-8"))
     ser.flush()
 
 
-# Create a dictionary of existing sample readings
-file_name = "field_strength.json"
-file_path = Path(__file__).parent / file_name
-if file_path.exists():
-    with file_path.open("r") as file:
-        samples = json.load(file)
-else:
-    # Create an empty dictionary if data file doesn't exist
-    samples = {}
+# Samples in the binary frames sent by the board (see code.py for the layout)
+SAMPLE_DTYPE = np.dtype([("t_us", "<u4"), ("x", "<f4"), ("y", "<f4"), ("z", "<f4")])
 
-# Query the user for current magnet distance
-while True:
-    try:
-        dist = int(input("Current Magnet Distance (2 - 22 cm)? "))
-        if 2 <= dist <= 22:
+
+# Time for one sample at the board's default oversampling and filter (see
+# conversion_ns() in code.py); a run gets twice its expected length, plus a
+# little to start up, before the board counts as not answering
+SAMPLE_SECONDS = 0.2
+RUN_STARTUP_SECONDS = 2
+
+
+def run_timeout(num_samples, sensor_delay):
+    return RUN_STARTUP_SECONDS + 2 * num_samples * max(SAMPLE_SECONDS, sensor_delay)
+
+
+def run_experiment(ser, num_samples, sensor_delay):
+    # Run the experiment once and return its raw samples
+    ser.timeout = run_timeout(num_samples, sensor_delay)
+    usb_writeline(ser, f"{num_samples},{sensor_delay}")
+    return read_run(ser, SAMPLE_DTYPE)
+
+
+def field_strength(raw):
+    # Magnitude of each raw sample's field (uT)
+    xyz = np.stack([raw["x"], raw["y"], raw["z"]]).astype(np.float64)
+    return np.sqrt(np.sum(xyz**2, axis=0))
+
+
+def parse_distances(text):
+    # "all" or a comma separated list of distances and ranges, e.g. "4,6,10-14"
+    if text == "all":
+        return list(range(MIN_DISTANCE, MAX_DISTANCE + 1))
+    distances = []
+    for part in text.split(","):
+        first, _, last = part.strip().partition("-")
+        try:
+            first = int(first)
+            last = int(last) if last else first
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"not a distance or range: {part!r}")
+        if not MIN_DISTANCE <= first <= last <= MAX_DISTANCE:
+            raise argparse.ArgumentTypeError(
+                f"distances must be between {MIN_DISTANCE} and {MAX_DISTANCE} cm"
+            )
+        distances.extend(d for d in range(first, last + 1) if d not in distances)
+    return distances
+
+
+def prompt(distance):
+    # Wait for the operator to place the magnet
+    # Returns "measure", "skip" or "quit"
+    while True:
+        answer = input(
+            f"Place the magnet at {distance} cm and press Enter "
+            "(s = skip, q = quit): "
+        )
+        answer = answer.strip().lower()
+        if answer == "":
+            return "measure"
+        if answer in ("s", "skip"):
+            return "skip"
+        if answer in ("q", "quit"):
+            return "quit"
+        print("Please press Enter, or type s or q.")
+
+
+def run_session(ser, args, store):
+    for distance in args.distances:
+        action = prompt(distance)
+        if action == "quit":
             break
-        else:
-            print("Please enter an integer between 2 and 22 inclusive.")
-    except ValueError:
-        print("That is not a valid integer. Please try again.")
-
-# Send parameters and start experiment
-num_samples = 25
-sensor_delay = 0.1
-params = f"{num_samples},{sensor_delay}"
-usb_writeline(params)
-print("Magnetometer experiment is running...")
-
-# Read from MCU the magnetic field strength
-field_str = float(usb_readline())
-ser.close()
-print(f"Mean Magnetic Field Strength = {field_str:.2f} uT")
-
-# Update the samples dictionary
-samples[f"{dist:02d}"] = f"{field_str:.2f}"
-samples = {key: samples[key] for key in sorted(samples)}
-
-# Update the JSON datafile
-with file_path.open("w") as file:
-    json.dump(samples, file, indent=4)
-
-# Display the samples dictionary
-print()
-print("Updated field_strength.json:")
-pprint(samples, width=1)
+        if action == "skip":
+            continue
+
+        # Repeat the measurement without moving the magnet
+        means = []
+        for trial in range(args.trials):
+            if args.trials > 1:
+                print(f"Trial {trial + 1} of {args.trials}...")
+            raw = run_experiment(ser, args.samples, args.sensor_delay)
+            if len(raw) == 0:
+                print("No samples received")
+                continue
+            print(f"Received {len(raw)} samples over {raw['t_us'][-1] / 1e6:.2f} s")
+            field = field_strength(raw)
+            # Save every trial straight away so nothing is lost if the
+            # session stops
+            store.append(distance, field)
+            means.append(field.mean())
+            print(f"Mean Magnetic Field Strength = {field.mean():.2f} uT")
+            if len(field) > 1:
+                print(f"Standard Deviation = {field.std(ddof=1):.2f} uT")
+        if len(means) > 1:
+            field_str = np.mean(means)
+            spread = np.std(means, ddof=1)
+            print(f"{distance} cm: {field_str:.2f} +/- {spread:.2f} uT over trials")
+        print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure magnetic field strength")
+    parser.add_argument("--port", help="data port (default: the first board's)")
+    parser.add_argument(
+        "--distances",
+        type=parse_distances,
+        default="all",
+        help='distances in cm, e.g. "4,6,10-14" (default: all, 2 to 22)',
+    )
+    parser.add_argument(
+        "--trials", type=int, default=1, help="runs to average at each distance"
+    )
+    parser.add_argument("--samples", type=int, default=25, help="samples in each run")
+    parser.add_argument(
+        "--sensor-delay",
+        type=float,
+        default=0,
+        help="minimum seconds between samples (0 reads as fast as possible)",
+    )
+    args = parser.parse_args()
+
+    store = open_store()
+
+    # Keep one connection open for the whole session
+    ser = open_port(args.port)
+    try:
+        run_session(ser, args, store)
+    finally:
+        ser.close()
+
+    # Display every distance measured so far
+    print(f"Trials pooled from {STORE_NAME}:")
+    for distance, mean, std, n in zip(*store.summary()):
+        print(f"{distance:4d} cm  {mean:8.2f} +/- {std:.2f} uT  ({n} samples)")
+
+
+if __name__ == "__main__":
+    main()
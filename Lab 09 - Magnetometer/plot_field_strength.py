@@ -1,46 +1,70 @@
 # plot_field_strength.py
 # Plot magnetic field strength samples
 # Fit a curve using  Linear Regression
+#
+#   python plot_field_strength.py                    # fit and show the plot
+#   python plot_field_strength.py --no-plot          # just print the fits
+#   python plot_field_strength.py --save field.png   # save the plot, no window
 
 
-import json
+import argparse
 import sys
 from pathlib import Path
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.ticker import MultipleLocator
-
-
-# Create a dictionary of existing sample readings
-file_name = "field_strength.json"
-file_path = Path(__file__).parent / file_name
-if not file_path.exists():
-    print(f'Missing "{file_name}"')
-    sys.exit(0)
-with file_path.open("r") as file:
-    samples = json.load(file)
-
-# Create NumPy arrays to hold independent and dependent sample values
-dist = np.array([float(k) for k in samples.keys()])
-field_strength = np.array([float(v) for v in samples.values()])
-
-# Use linear regression (least squares) to fit two polynomials
-c2 = np.polyfit(dist, field_strength, 2)
-c3 = np.polyfit(dist, field_strength, 3)
-
-# Create smooth arrays to store estimated values
-est_x = np.linspace(2, 22, 500)
-est_y2 = c2[0] * est_x**2 + c2[1] * est_x + c2[2]
-est_y3 = c3[0] * est_x**3 + c3[1] * est_x**2 + c3[2] * est_x + c3[3]
-
-# Plot the sample data and the two polynomials
-plt.figure(Path(__file__).name)
-plt.scatter(dist, field_strength, color="black")
-plt.plot(est_x, est_y2, color="blue", label="Quadratic")
-plt.plot(est_x, est_y3, color="red", label="Cubic")
-plt.legend()
-plt.title("Field Strength vs. Distance")
-plt.xlabel("Distance (cm)")
-plt.ylabel("Field Strength (uT)")
-plt.gca().xaxis.set_major_locator(MultipleLocator(2))
-plt.show()
+from sample_store import STORE_NAME, open_store
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from analysis import describe_fit, finish, polyfit, polyval, pyplot  # noqa: E402
+
+
+def load(store):
+    # Pool every trial at each distance from the sample store
+    dist, field_strength, field_std, counts = store.summary()
+    return dist.astype(float), field_strength, field_std
+
+
+def fit(dist, field_strength):
+    # Use linear regression (least squares) to fit two polynomials
+    return polyfit(dist, field_strength, 2), polyfit(dist, field_strength, 3)
+
+
+def plot(dist, field_strength, field_std, fits, save=None):
+    plt = pyplot(save)
+    from matplotlib.ticker import MultipleLocator
+
+    # Create smooth arrays to store estimated values
+    est_x = np.linspace(2, 22, 500)
+    quadratic, cubic = fits
+
+    # Plot the sample data and the two polynomials
+    plt.figure(Path(__file__).name)
+    plt.errorbar(dist, field_strength, yerr=field_std, fmt="o", color="black")
+    plt.plot(est_x, polyval(quadratic.coeffs, est_x), color="blue", label="Quadratic")
+    plt.plot(est_x, polyval(cubic.coeffs, est_x), color="red", label="Cubic")
+    plt.legend()
+    plt.title("Field Strength vs. Distance")
+    plt.xlabel("Distance (cm)")
+    plt.ylabel("Field Strength (uT)")
+    plt.gca().xaxis.set_major_locator(MultipleLocator(2))
+    finish(plt, save)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit field strength by distance")
+    parser.add_argument("--no-plot", action="store_true", help="only print the fits")
+    parser.add_argument("--save", type=Path, help="save the plot here (PNG, PDF, ...)")
+    args = parser.parse_args()
+
+    dist, field_strength, field_std = load(open_store())
+    if len(dist) < 4:
+        print(f'Not enough distances in "{STORE_NAME}" to fit a cubic')
+        sys.exit(0)
+    fits = fit(dist, field_strength)
+    for f in fits:
+        print(describe_fit(f))
+    if not args.no_plot:
+        plot(dist, field_strength, field_std, fits, args.save)
+
+
+if __name__ == "__main__":
+    main()
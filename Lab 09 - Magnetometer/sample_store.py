@@ -0,0 +1,156 @@
+# sample_store.py
+# Append-only store of magnetometer trials, one JSON object per line
+# Every trial is kept with its time and sample statistics, and an index by
+# distance is built as the file is read so queries never rescan it
+#
+#   store = SampleStore(Path("field_strength.jsonl"))
+#   store.append(distance=6, field=field_array)
+#   distances, means, stds, counts = store.summary()
+
+import json
+import math
+import time
+from pathlib import Path
+
+import numpy as np
+
+STORE_NAME = "field_strength.jsonl"
+LEGACY_NAME = "field_strength.json"
+
+
+def trial_record(distance, field, **tags):
+    # Summarize one run's field strengths (uT) as a store record
+    # tags (e.g. board and student) are stored alongside
+    field = np.asarray(field, dtype=np.float64)
+    record = {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "distance": int(distance),
+        "n": int(len(field)),
+        "mean": float(field.mean()) if len(field) else None,
+        "std": float(field.std(ddof=1)) if len(field) > 1 else None,
+        "min": float(field.min()) if len(field) else None,
+        "max": float(field.max()) if len(field) else None,
+    }
+    record.update(tags)
+    return record
+
+
+def pooled(records):
+    # Mean and standard deviation of all the samples behind some trials,
+    # combined from each trial's n, mean and std
+    n = sum(r["n"] for r in records)
+    if n == 0:
+        return math.nan, math.nan, 0
+    mean = sum(r["n"] * r["mean"] for r in records) / n
+    if n < 2:
+        return mean, math.nan, n
+    # Sum of squared deviations within trials plus between trial means
+    ss = 0.0
+    for r in records:
+        if r["n"] > 1 and r["std"] is not None:
+            ss += (r["n"] - 1) * r["std"] ** 2
+        ss += r["n"] * (r["mean"] - mean) ** 2
+    return mean, math.sqrt(ss / (n - 1)), n
+
+
+class SampleStore:
+    def __init__(self, path):
+        self.path = Path(path)
+        self.records = []
+        # Positions in records of each distance's trials
+        self.by_distance = {}
+        # How far into the file has been read, so records appended by
+        # another process are picked up without reading it all again
+        self.offset = 0
+
+    def refresh(self):
+        # Read any records added to the file since the last refresh
+        if not self.path.exists():
+            return
+        with self.path.open("rb") as file:
+            file.seek(self.offset)
+            for line in file:
+                if not line.endswith(b"\n"):
+                    break  # A record still being written
+                self.offset += len(line)
+                line = line.strip()
+                if line:
+                    self._index(json.loads(line))
+
+    def _index(self, record):
+        self.by_distance.setdefault(record["distance"], []).append(len(self.records))
+        self.records.append(record)
+
+    def append(self, distance=None, field=None, record=None, **tags):
+        # Add one trial, from its field strengths or a ready made record
+        if record is None:
+            record = trial_record(distance, field, **tags)
+        line = (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8")
+        # One append-mode write per record, so lines from other processes
+        # never interleave with it. The record is indexed by reading it back
+        # rather than by moving offset past it here, since another process
+        # may have appended before it
+        with self.path.open("ab") as file:
+            file.write(line)
+        self.refresh()
+        return record
+
+    def distances(self):
+        self.refresh()
+        return sorted(self.by_distance)
+
+    def trials(self, distance, **tags):
+        # Every trial at a distance, oldest first, optionally only those
+        # with matching tags (e.g. student="Ada")
+        self.refresh()
+        trials = [self.records[i] for i in self.by_distance.get(distance, [])]
+        for key, value in tags.items():
+            trials = [r for r in trials if r.get(key) == value]
+        return trials
+
+    def summary(self, **tags):
+        # Arrays of distance, mean, standard deviation and sample count,
+        # pooling every trial at each distance
+        rows = []
+        for distance in self.distances():
+            trials = [r for r in self.trials(distance, **tags) if r["n"]]
+            if trials:
+                rows.append((distance, *pooled(trials)))
+        if not rows:
+            empty = np.empty(0)
+            return empty, empty, empty, np.empty(0, dtype=int)
+        distance, mean, std, n = zip(*rows)
+        return np.array(distance), np.array(mean), np.array(std), np.array(n)
+
+    def migrate_json(self, json_path):
+        # Import the single values of the old field_strength.json once
+        # Their sample statistics were never saved, so n is 1 and std is unset
+        json_path = Path(json_path)
+        if not json_path.exists() or self.path.exists():
+            return 0
+        with json_path.open("r") as file:
+            old = json.load(file)
+        for key, value in sorted(old.items()):
+            self.append(
+                record={
+                    "time": None,
+                    "distance": int(key),
+                    "n": 1,
+                    "mean": float(value),
+                    "std": None,
+                    "min": float(value),
+                    "max": float(value),
+                    "source": json_path.name,
+                }
+            )
+        return len(old)
+
+
+def open_store(folder=None):
+    # The lab's store, importing field_strength.json the first time
+    folder = Path(__file__).parent if folder is None else Path(folder)
+    store = SampleStore(folder / STORE_NAME)
+    count = store.migrate_json(folder / LEGACY_NAME)
+    if count:
+        print(f"Imported {count} readings from {LEGACY_NAME} into {STORE_NAME}")
+    return store
@@ -0,0 +1,239 @@
+# batch_report.py
+# Fit and plot every student's Geiger counter data without opening windows
+# Finds "<student> - mantle.txt" and "<student> - rods.txt" files, fits a
+# line and a quadratic to each, renders one report per student across a
+# process pool, and writes a summary table of the fits
+# The counts are corrected for the tube's dead time first (--dead-time, the
+# board's default unless given, 0 to turn it off); a student's
+# "<student> - arrivals.txt" pulse times, when present, give their own
+# fitted dead time instead
+#
+#   python batch_report.py submissions/ --output reports/ --format pdf
+#   python batch_report.py submissions/ --dead-time 150e-6
+
+import argparse
+import csv
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from analysis import (  # noqa: E402
+    COUNT_SECONDS,
+    DEAD_TIME,
+    EXPERIMENTS,
+    add_dead_time_arguments,
+    draw_fits,
+    fit_at,
+    fit_dead_time,
+    polyfit,
+    pyplot,
+    true_counts,
+)
+
+TITLES = {"mantle": "Decay Events By Distance", "rods": "Decay Events Per Rod"}
+ARRIVALS = "arrivals"
+SUMMARY_FIELDS = [
+    "student",
+    "experiment",
+    "readings",
+    "dead_time",
+    "max_rate",
+    "max_true_rate",
+    "slope",
+    "slope_err",
+    "intercept",
+    "linear_r2",
+    "a",
+    "b",
+    "c",
+    "a_err",
+    "quadratic_r2",
+]
+
+
+def discover(folders):
+    # Map each student to their data files, keyed by experiment
+    # (or ARRIVALS for their pulse times)
+    students = {}
+    for folder in folders:
+        for experiment in (*EXPERIMENTS, ARRIVALS):
+            for path in sorted(Path(folder).glob(f"* - {experiment}.txt")):
+                student = path.name[: -len(f" - {experiment}.txt")]
+                students.setdefault(student, {})[experiment] = path
+    return students
+
+
+def fit_all(make_x, datasets):
+    # Fit every dataset of one experiment in a single batch, padding the
+    # shorter ones with NaN; returns the linear and quadratic fits
+    length = max(len(counts) for counts in datasets)
+    x = np.full((len(datasets), length), np.nan)
+    y = np.full((len(datasets), length), np.nan)
+    for i, counts in enumerate(datasets):
+        x[i, : len(counts)] = make_x(len(counts))
+        y[i, : len(counts)] = counts
+    return polyfit(x, y, 1), polyfit(x, y, 2)
+
+
+def render(student, panels, output, fmt):
+    # Draw one student's report; runs in a worker process
+    plt = pyplot(save=True)
+    fig, axes = plt.subplots(1, len(panels), figsize=(6 * len(panels), 4.5))
+    axes = np.atleast_1d(axes)
+    for ax, panel in zip(axes, panels):
+        experiment, x, counts, observed, fits = panel
+        label, _ = EXPERIMENTS[experiment]
+        draw_fits(ax, x, counts, fits, observed=observed)
+        ax.set_title(TITLES[experiment])
+        ax.set_xlabel(label)
+        ax.set_ylabel("Number of Events")
+        ax.set_ylim(0)
+        ax.legend()
+    fig.suptitle(student)
+    fig.tight_layout()
+    path = Path(output) / f"{student}.{fmt}"
+    fig.savefig(path)
+    plt.close(fig)
+    return path
+
+
+def dead_times(students, dead_time=DEAD_TIME, model="nonparalyzable"):
+    # Each student's dead time: fitted to their pulse times if they have
+    # any, otherwise the one given for everyone
+    result = {}
+    for student, files in students.items():
+        result[student] = dead_time
+        if ARRIVALS in files:
+            try:
+                fit = fit_dead_time(np.loadtxt(files[ARRIVALS]), model)
+            except ValueError as error:
+                print(f"{student}: {error}")
+                continue
+            result[student] = fit.dead_time
+    return result
+
+
+def build_reports(
+    students,
+    output,
+    fmt="png",
+    jobs=None,
+    dead_time=DEAD_TIME,
+    model="nonparalyzable",
+):
+    # Fit everything up front, then render the reports in parallel
+    # Returns the summary rows
+    rows = []
+    panels = {student: [] for student in students}
+    tau = dead_times(students, dead_time, model)
+    for experiment, (_, make_x) in EXPERIMENTS.items():
+        entries = [
+            (student, np.atleast_1d(np.loadtxt(files[experiment])))
+            for student, files in sorted(students.items())
+            if experiment in files
+        ]
+        entries = [(s, counts) for s, counts in entries if len(counts) >= 3]
+        if not entries:
+            continue
+        corrected = [
+            true_counts(counts, COUNT_SECONDS, tau[student], model)
+            for student, counts in entries
+        ]
+        linear, quadratic = fit_all(make_x, corrected)
+        for i, (student, observed) in enumerate(entries):
+            x = make_x(len(observed))
+            counts = corrected[i]
+            panels[student].append(
+                (
+                    experiment,
+                    x,
+                    counts,
+                    observed if tau[student] else None,
+                    (fit_at(linear, i), fit_at(quadratic, i)),
+                )
+            )
+            rows.append(
+                {
+                    "student": student,
+                    "experiment": experiment,
+                    "readings": len(counts),
+                    "dead_time": tau[student],
+                    "max_rate": np.max(observed) / COUNT_SECONDS,
+                    "max_true_rate": np.max(counts) / COUNT_SECONDS,
+                    "slope": linear.coeffs[i][0],
+                    "slope_err": linear.stderr[i][0],
+                    "intercept": linear.coeffs[i][1],
+                    "linear_r2": linear.r2[i],
+                    "a": quadratic.coeffs[i][0],
+                    "b": quadratic.coeffs[i][1],
+                    "c": quadratic.coeffs[i][2],
+                    "a_err": quadratic.stderr[i][0],
+                    "quadratic_r2": quadratic.r2[i],
+                }
+            )
+
+    Path(output).mkdir(parents=True, exist_ok=True)
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [
+            pool.submit(render, student, student_panels, output, fmt)
+            for student, student_panels in sorted(panels.items())
+            if student_panels
+        ]
+        for future in futures:
+            print(f"Wrote {future.result()}")
+    return rows
+
+
+def write_summary(rows, path):
+    with open(path, "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=SUMMARY_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def print_summary(rows):
+    print(
+        f"{'student':20s}{'experiment':>11s}{'n':>4s}{'tau us':>7s}{'slope':>10s}"
+        f"{'lin R2':>8s}{'a':>11s}{'quad R2':>9s}"
+    )
+    for row in rows:
+        print(
+            f"{row['student'][:20]:20s}{row['experiment']:>11s}{row['readings']:4d}"
+            f"{row['dead_time'] * 1e6:7.0f}{row['slope']:10.3f}{row['linear_r2']:8.4f}"
+            f"{row['a']:11.4g}{row['quadratic_r2']:9.4f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report every student's Geiger fits")
+    parser.add_argument(
+        "folders",
+        nargs="*",
+        type=Path,
+        default=[Path(__file__).parent],
+        help="folders holding the student data files (default: this lab)",
+    )
+    parser.add_argument("--output", type=Path, default=Path("reports"))
+    parser.add_argument("--format", choices=["png", "pdf"], default="png")
+    parser.add_argument("--jobs", type=int, help="worker processes (default: CPUs)")
+    add_dead_time_arguments(parser, arrivals=False)
+    args = parser.parse_args()
+
+    students = discover(args.folders)
+    if not students:
+        print("No student data files found")
+        return
+    rows = build_reports(
+        students, args.output, args.format, args.jobs, args.dead_time, args.model
+    )
+    summary = args.output / "summary.csv"
+    write_summary(rows, summary)
+    print_summary(rows)
+    print(f"Summary written to {summary}")
+
+
+if __name__ == "__main__":
+    main()
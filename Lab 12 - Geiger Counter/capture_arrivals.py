@@ -0,0 +1,118 @@
+# capture_arrivals.py
+# Record the time of every Geiger counter pulse streamed by the board
+# Press X on the board's Geiger Counter screen to start streaming and Y to
+# stop; the pulse times are saved to "<student> - arrivals.txt" in seconds
+#
+#   python capture_arrivals.py DaveB
+#   python capture_arrivals.py DaveB --save intervals.png
+
+import argparse
+import sys
+from pathlib import Path
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from analysis import (  # noqa: E402
+    MODELS,
+    finish,
+    fit_dead_time,
+    open_port,
+    pyplot,
+    read_run,
+    true_rate,
+)
+
+# Each timestamp in the board's frames (see capture_arrivals() in code.py);
+# the last value of a capture is instead the number of pulses the board saw
+TIMER_DTYPE = np.dtype("<u4")
+TICK_HZ = 1_000_000
+
+
+def show_progress(pulses):
+    print(f"\r{pulses:,} pulses", end="", flush=True)
+
+
+def arrival_times(values):
+    # Convert the board's count-down timer values into seconds since the
+    # first pulse, unwrapping the 32-bit tick count
+    ticks = (~values.astype(np.uint32)).astype(np.int64)
+    steps = np.diff(ticks) % (1 << 32)
+    return np.concatenate(([0], np.cumsum(steps))) / TICK_HZ
+
+
+def plot(times, dead_time=0.0, save=None):
+    # Histogram of the time between pulses, with the exponential
+    # distribution a Poisson source at the measured rate would give,
+    # shifted by the tube's dead time
+    plt = pyplot(save)
+    intervals = np.diff(times) * 1000  # ms
+    dead_time *= 1000  # ms
+    rate = 1 / (np.mean(intervals) - dead_time)  # true rate per ms
+    plt.figure("capture_arrivals.py")
+    counts, edges, _ = plt.hist(intervals, bins=100, color="red", alpha=0.6)
+    width = edges[1] - edges[0]
+    x = np.linspace(dead_time, edges[-1], 500)
+    expected = len(intervals) * width * rate * np.exp(-rate * (x - dead_time))
+    plt.plot(x, expected, color="blue", label="Poisson")
+    plt.title("Time Between Pulses")
+    plt.xlabel("Interval (ms)")
+    plt.ylabel("Number of Pulses")
+    plt.legend()
+    finish(plt, save)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record Geiger pulse times")
+    parser.add_argument("student", help='saves "<student> - arrivals.txt"')
+    parser.add_argument("--port", help="data port (default: the first board's)")
+    parser.add_argument("--no-plot", action="store_true", help="skip the histogram")
+    parser.add_argument("--save", type=Path, help="save the histogram here")
+    parser.add_argument(
+        "--model", choices=MODELS, default=MODELS[0], help="dead-time model"
+    )
+    args = parser.parse_args()
+
+    # No timeout: the capture starts whenever X is pressed on the board
+    ser = open_port(args.port, timeout=None)
+    print("Press X on the board's Geiger Counter screen to start, Y to stop")
+    try:
+        values = read_run(ser, TIMER_DTYPE, show_progress)
+    finally:
+        ser.close()
+    print()
+    if len(values) == 0:
+        print("No capture received")
+        return
+    values, pulses = values[:-1], int(values[-1])
+    lost = max(0, pulses - len(values))
+    print(f"Captured {len(values):,} of {pulses:,} pulses")
+    if lost:
+        # Lost pulses leave gaps that stretch the intervals around them
+        print(
+            f"Warning: {lost:,} pulses ({lost / pulses:.1%}) came too fast for "
+            "the board to timestamp; the rate and dead time are biased"
+        )
+    if len(values) < 2:
+        print("Not enough pulses recorded")
+        return
+
+    times = arrival_times(values)
+    path = Path(__file__).parent / f"{args.student} - arrivals.txt"
+    np.savetxt(path, times, fmt="%.6f")
+    print(f"Saved {len(times)} pulse times to {path.name}")
+    # The board's count includes the pulses it couldn't timestamp
+    rate = (pulses - 1) / times[-1]
+    print(f"Rate = {rate:.2f} /s over {times[-1]:.1f} s")
+    dead_time = 0.0
+    if len(times) > 2:
+        fit = fit_dead_time(times, args.model)
+        dead_time = fit.dead_time
+        print(f"Dead time = {dead_time * 1e6:.1f} ± {fit.stderr * 1e6:.1g} us")
+        rate = true_rate(rate, dead_time, args.model)
+        print(f"True rate = {rate:.2f} /s ({args.model})")
+    if not args.no_plot:
+        plot(times, dead_time, args.save)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,32 @@
 # code.py
 
-VERSION_NUM = 1.2
+VERSION_NUM = 1.3
 
 import adafruit_displayio_sh1107
 import adafruit_ina219
+import adafruit_pioasm
 import analogio
 import asyncio
+import binascii
 import board
 import busio
 import countio
 import digitalio
 import displayio
+import gc
+import math
 import neopixel
 import pwmio
+import rp2pio
+import struct
+import supervisor
 import sys
 import terminalio
 import time
+import usb_cdc
 
 from adafruit_display_text import label
+from array import array
 from adafruit_max1704x import MAX17048
 from adafruit_lc709203f import LC709203F, PackSize
 from adafruit_seesaw.seesaw import Seesaw
@@ -64,131 +73,789 @@ ss = Seesaw(i2c_bus)
 ss.pin_mode_bulk(button_mask, ss.INPUT_PULLUP)
 
 # Initialize Current Sensor
+# Each conversion averages 8 samples on-chip (4.26 ms per shunt or bus
+# reading), with both readings converted continuously
 ina219 = adafruit_ina219.INA219(i2c_bus)
 ina219.set_calibration_16V_400mA()
+ina219.bus_adc_resolution = adafruit_ina219.ADCResolution.ADCRES_12BIT_8S
+ina219.shunt_adc_resolution = adafruit_ina219.ADCResolution.ADCRES_12BIT_8S
+ina219.mode = adafruit_ina219.Mode.SANDBVOLT_CONTINUOUS
+INA219_CONVERSION_NS = 2 * 4_260_000  # Shunt plus bus conversion time
 
 # Initialize NeoPixel
 pixel_builtin = neopixel.NeoPixel(board.NEOPIXEL, 1)
 pixel_builtin.brightness = 0.3
 
 # Initialize UART
-uart = busio.UART(board.TX, board.RX, baudrate=115200)
+# (timeout=0 so reads never block the event loop)
+uart = busio.UART(
+    board.TX, board.RX, baudrate=115200, timeout=0, receiver_buffer_size=512
+)
+
+
+# Profiling statistics: name -> [calls, total ms, max ms]
+# Names starting with "wake:" record how late a coroutine woke from a sleep
+profile_stats = {}
+mem_free_low = None
+mem_free_high = None
+TICKS_PERIOD = const(1 << 29)
+TICKS_HALF_PERIOD = const(1 << 28)
+
+
+def ticks_diff(t1, t0):
+    # Milliseconds from t0 to t1, allowing for supervisor.ticks_ms() wrapping
+    return ((t1 - t0 + TICKS_HALF_PERIOD) & (TICKS_PERIOD - 1)) - TICKS_HALF_PERIOD
+
+
+def record(name, ms):
+    stats = profile_stats.get(name)
+    if stats is None:
+        profile_stats[name] = [1, ms, ms]
+    else:
+        stats[0] += 1
+        stats[1] += ms
+        if ms > stats[2]:
+            stats[2] = ms
+
+
+def profile(name, t0):
+    # Record a call to name that started when supervisor.ticks_ms() was t0
+    record(name, ticks_diff(supervisor.ticks_ms(), t0))
+
+
+async def profiled_sleep(name, seconds):
+    # asyncio.sleep() that records how late the coroutine woke up
+    t0 = supervisor.ticks_ms()
+    await asyncio.sleep(seconds)
+    record(name, ticks_diff(supervisor.ticks_ms(), t0) - int(seconds * 1000))
+
+
+async def watch_memory(interval=0.5):
+    # Track the low and high water marks of free heap memory
+    global mem_free_low, mem_free_high
+    while True:
+        free = gc.mem_free()
+        if mem_free_low is None or free < mem_free_low:
+            mem_free_low = free
+        if mem_free_high is None or free > mem_free_high:
+            mem_free_high = free
+        await asyncio.sleep(interval)
+
+
+def profile_lines():
+    # One line per statistic, each fitting the OLED's 21 characters
+    lines = [f"Mem free {mem_free_low // 1024}-{mem_free_high // 1024} KB"]
+    for name in sorted(profile_stats):
+        calls, total, longest = profile_stats[name]
+        lines.append(f"{name[:11]:11s}{total / calls:5.1f}{longest:5d}")
+    return lines
+
+
+def print_profile():
+    print(f"Free memory: low {mem_free_low} bytes, high {mem_free_high} bytes")
+    print(f"{'name':16s}{'calls':>8s}{'avg ms':>8s}{'max ms':>8s}")
+    for name in sorted(profile_stats):
+        calls, total, longest = profile_stats[name]
+        print(f"{name:16s}{calls:8d}{total / calls:8.1f}{longest:8d}")
+
+
+# Pre-allocated labels for the four lines of text on the OLED
+text_lines = []
+screen_dirty = False
 
 
 def init_screen():
+    # Only refresh the OLED when display_line() has changed something
+    display.auto_refresh = False
     # Set entire OLED to black
     bg_bitmap = displayio.Bitmap(128, 64, 1)  # One bitmap only
     bg_palette = displayio.Palette(1)  # One color only
     bg_palette[0] = 0x000000  # Black
     bg_sprite = displayio.TileGrid(bg_bitmap, pixel_shader=bg_palette, x=0, y=0)
     screen.append(bg_sprite)
-    # Prepopulate four lines of blank (black) text
-    for _ in range(4):
-        text_area = label.Label(terminalio.FONT, text="", color=0x000000, x=0, y=0)
+    # Prepopulate four lines of blank text which are reused for every update
+    for line in range(4):
+        sy = line * 14
+        text_area = label.Label(terminalio.FONT, text="", color=0xFFFFFF, x=0, y=sy + 4)
         screen.append(text_area)
+        text_lines.append(text_area)
 
 
 def display_line(line, text):
     # Overwrite the existing line # of text
     # Only a max of 4 lines fits in the OLED height
     # Only a max of 21 characters per line fits in OLED width
-    sy = line * 14
-    text_area = label.Label(terminalio.FONT, text=text, color=0xFFFFFF, x=0, y=sy + 4)
-    screen[line] = text_area
-    time.sleep(0.01)
+    global screen_dirty
+    t0 = supervisor.ticks_ms()
+    text_area = text_lines[line]
+    if text_area.text != text:
+        text_area.text = text
+        screen_dirty = True
+    profile("display_line", t0)
+
+
+async def refresh_screen(interval=0.05):
+    # Push all pending line changes to the OLED in a single refresh
+    global screen_dirty
+    while True:
+        if screen_dirty:
+            screen_dirty = False
+            t0 = supervisor.ticks_ms()
+            display.refresh()
+            profile("refresh", t0)
+        await profiled_sleep("wake:screen", interval)
+
+
+class ButtonEvents:
+    # Fixed size FIFO of (button, pressed) events that coroutines can await
+    def __init__(self, size=8):
+        self.events = [None] * size
+        self.head = 0
+        self.length = 0
+        self.ready = asyncio.Event()
+
+    def put(self, event):
+        # Drop the oldest event when nobody is reading the queue
+        if self.length == len(self.events):
+            self.head = (self.head + 1) % len(self.events)
+            self.length -= 1
+        self.events[(self.head + self.length) % len(self.events)] = event
+        self.length += 1
+        self.ready.set()
+
+    def get_nowait(self):
+        if self.length == 0:
+            return None
+        event = self.events[self.head]
+        self.head = (self.head + 1) % len(self.events)
+        self.length -= 1
+        return event
+
+    async def get(self):
+        while self.length == 0:
+            self.ready.clear()
+            await self.ready.wait()
+        return self.get_nowait()
+
+    def clear(self):
+        self.head = 0
+        self.length = 0
+
+
+button_events = ButtonEvents()
 
 
 def read_buttons():
-    buttons = ss.digital_read_bulk(button_mask)
-    if not buttons & (1 << BUTTON_LEFT):
-        return BUTTON_LEFT
-    if not buttons & (1 << BUTTON_RIGHT):
-        return BUTTON_RIGHT
-    if not buttons & (1 << BUTTON_UP):
-        return BUTTON_UP
-    if not buttons & (1 << BUTTON_DOWN):
-        return BUTTON_DOWN
-    return None
-
-
-def send_cmd(cmd):
+    # Return a bit mask of the buttons currently held down
+    # (The Joy Wing's buttons pull their pins low when pressed)
+    t0 = supervisor.ticks_ms()
+    buttons = ~ss.digital_read_bulk(button_mask) & button_mask
+    profile("read_buttons", t0)
+    return buttons
+
+
+async def poll_buttons(interval=0.02, debounce_samples=2):
+    # Sample the Joy Wing at a fixed rate and queue an event for every
+    # button press or release that stays stable for debounce_samples reads
+    stable = 0
+    candidate = 0
+    same_count = 0
+    while True:
+        buttons = read_buttons()
+        if buttons == candidate:
+            same_count += 1
+        else:
+            candidate = buttons
+            same_count = 1
+        if same_count >= debounce_samples and candidate != stable:
+            changed = candidate ^ stable
+            for button in (BUTTON_LEFT, BUTTON_RIGHT, BUTTON_UP, BUTTON_DOWN):
+                if changed & (1 << button):
+                    button_events.put((button, bool(candidate & (1 << button))))
+            stable = candidate
+        await profiled_sleep("wake:buttons", interval)
+
+
+async def next_button():
+    # Wait for the next button press (releases are skipped)
+    while True:
+        button, pressed = await button_events.get()
+        if pressed:
+            return button
+
+
+def pressed_button():
+    # Return the oldest queued button press without waiting, or None
+    while True:
+        event = button_events.get_nowait()
+        if event is None:
+            return None
+        if event[1]:
+            return event[0]
+
+
+# Reusable receive buffer for the triad sensor's response lines
+uart_buffer = bytearray(512)
+uart_view = memoryview(uart_buffer)
+uart_length = 0
+
+
+async def read_line(timeout):
+    # Collect bytes from the UART until a complete line has arrived
+    # Returns the line's length at the front of uart_buffer (call
+    # consume_line() once done with it), or -1 after timeout seconds
+    global uart_length
+    deadline = time.monotonic_ns() + int(timeout * 1_000_000_000)
+    scanned = 0
+    while True:
+        # Look for the end of a line in the bytes not yet scanned
+        while scanned < uart_length:
+            if uart_buffer[scanned] == 0x0A:  # "\n"
+                return scanned
+            scanned += 1
+        if time.monotonic_ns() >= deadline:
+            return -1
+        if uart.in_waiting and uart_length < len(uart_buffer):
+            n = uart.readinto(uart_view[uart_length:])
+            if n:
+                uart_length += n
+        else:
+            await asyncio.sleep(0.005)
+
+
+def consume_line(length):
+    # Shift any pipelined responses to the front of the buffer
+    global uart_length
+    remaining = uart_length - length - 1
+    uart_view[:remaining] = uart_view[length + 1 : uart_length]
+    uart_length = remaining
+
+
+async def read_status(timeout):
+    # Returns the next line as a stripped string, or None after timeout seconds
+    length = await read_line(timeout)
+    if length < 0:
+        return None
+    status = bytes(uart_view[:length]).decode("ASCII").strip()
+    consume_line(length)
+    return status
+
+
+def parse_frame(buf, length, frame):
+    # Parse a CSV line of numbers (e.g. "1.5,-0.25,...,3.0 OK") from
+    # buf[:length] straight into the frame array without allocating strings
+    # Returns the number of values parsed
+    n = 0
+    i = 0
+    while i < length and n < len(frame):
+        c = buf[i]
+        if c == 0x2D or c == 0x2E or 0x30 <= c <= 0x39:  # "-", "." or digit
+            sign = 1.0
+            if c == 0x2D:
+                sign = -1.0
+                i += 1
+            value = 0.0
+            while i < length and 0x30 <= buf[i] <= 0x39:
+                value = value * 10 + (buf[i] - 0x30)
+                i += 1
+            if i < length and buf[i] == 0x2E:  # "."
+                i += 1
+                scale = 0.1
+                while i < length and 0x30 <= buf[i] <= 0x39:
+                    value += (buf[i] - 0x30) * scale
+                    scale /= 10
+                    i += 1
+            frame[n] = sign * value
+            n += 1
+        else:
+            i += 1
+    return n
+
+
+def write_cmd(cmd):
     # Append newline character to terminate command
-    # Then convert string to bytes() array which is what pySerial expects
-    cmd_with_newline = bytes(cmd, "ASCII") + bytes("\n", "ASCII")
     # Send command (Hayes Modem AT format) to device
-    uart.write(cmd_with_newline)
-    # Read status line from device, convert bytes() to ASCII, and remove whitespace
-    status = uart.readline().decode("ASCII").strip()
+    uart.write(bytes(cmd, "ASCII") + b"\n")
+
+
+def flush_uart():
+    # Discard stale replies (e.g. from a failed or stopped command)
+    global uart_length
+    uart.reset_input_buffer()
+    uart_length = 0
+
+
+async def send_cmd(cmd, timeout=1.0, retries=2):
+    # Send one command and wait for its status line
+    # Returns None if the sensor never answers or only reports errors
+    t0 = supervisor.ticks_ms()
+    status = None
+    for _ in range(retries + 1):
+        flush_uart()
+        write_cmd(cmd)
+        status = await read_status(timeout)
+        if status is not None and not status.startswith("ERROR"):
+            break
+        status = None
+    profile("send_cmd", t0)
     return status
 
 
-async def flash_neopixel(color, interval):
+async def send_cmds(cmds, timeout=1.0, retries=2):
+    # Pipeline a list of commands back-to-back, then collect their statuses
+    # Any command that fails is retried on its own
+    # Returns True only if every command succeeded
+    flush_uart()
+    for cmd in cmds:
+        write_cmd(cmd)
+    failed = []
+    for i, cmd in enumerate(cmds):
+        status = await read_status(timeout)
+        if status is None:
+            # The sensor went quiet, so don't wait on the remaining replies
+            failed.extend(cmds[i:])
+            break
+        if status.startswith("ERROR"):
+            failed.append(cmd)
+    for cmd in failed:
+        if await send_cmd(cmd, timeout, retries) is None:
+            return False
+    return True
+
+
+async def sleep_until(deadline_ns, poll_interval=0.05):
+    # Yield to the event loop until time.monotonic_ns() reaches the deadline
+    # Returns False if Y is pressed to abort before the deadline
     while True:
-        pixel_builtin.fill(color)
-        await asyncio.sleep(interval)
-        pixel_builtin.fill((0, 0, 0))
-        await asyncio.sleep(interval)
+        remaining = deadline_ns - time.monotonic_ns()
+        if remaining <= 0:
+            return True
+        if pressed_button() == BUTTON_LEFT:  # Y to abort
+            return False
+        await profiled_sleep("wake:timer", min(remaining / 1e9, poll_interval))
+
+
+class PixelStatus:
+    # What the NeoPixel should show: a color that is either held steady
+    # (interval is None) or blinked on and off every interval seconds
+    def __init__(self):
+        self.color = (0, 0, 0)
+        self.interval = None
+
+
+pixel_status = PixelStatus()
+
+
+def set_pixel(color, interval=None):
+    pixel_status.color = color
+    pixel_status.interval = interval
+
+
+async def run_neopixel(tick=0.05):
+    # One long-lived task drives the NeoPixel from pixel_status
+    # and only writes to it when the color shown actually changes
+    shown = None
+    while True:
+        color = pixel_status.color
+        interval = pixel_status.interval
+        if interval is not None:
+            # Blink in step with the clock so no timer needs restarting
+            if (time.monotonic_ns() // int(interval * 1_000_000_000)) % 2:
+                color = (0, 0, 0)
+        if color != shown:
+            pixel_builtin.fill(color)
+            shown = color
+        await profiled_sleep("wake:pixel", tick)
+
+
+def interval_counts(snapshots):
+    # Convert (time_ns, running_total) snapshots into the count per interval
+    return [snapshots[i][1] - snapshots[i - 1][1] for i in range(1, len(snapshots))]
+
+
+async def count_decay_events(num_intervals, seconds_per_interval):
+    # Keep one counter open for the entire run so no pulses are lost
+    # between intervals, and snapshot its running total at each boundary
+    # Returns the list of (time_ns, running_total) snapshots or None if aborted
+    total_seconds = num_intervals * seconds_per_interval
+    snapshots = []
+    with countio.Counter(board.A1, edge=countio.Edge.FALL) as pin_tick:
+        # Every one second tick is scheduled from the same starting time
+        # so display redraws never stretch the length of an interval
+        deadline = time.monotonic_ns()
+        snapshots.append((deadline, pin_tick.count))
+        for _ in range(num_intervals):
+            for _ in range(seconds_per_interval):
+                display_line(1, f"{total_seconds:2.0f} seconds remain...")
+                total_seconds -= 1
+                deadline += 1_000_000_000
+                if not await sleep_until(deadline):
+                    return None
+            t0 = supervisor.ticks_ms()
+            snapshots.append((time.monotonic_ns(), pin_tick.count))
+            profile("countio", t0)
+            counts = interval_counts(snapshots)
+            c = sum(counts) / len(counts)  # Average count per interval
+            display_line(2, f"Avg Count = {c:,.0f}")
+    return snapshots
+
+
+# Adaptive counting stops once the relative Poisson uncertainty 1/sqrt(N)
+# of the total count N reaches the target, or after the maximum time
+ADAPTIVE_TARGET = 0.03  # 3 %, about 1,100 counts
+ADAPTIVE_MIN_SECONDS = 5
+ADAPTIVE_MAX_SECONDS = 300
+
+
+# Geiger tube dead time: the tube misses pulses for this long after each one,
+# so the observed rate m falls below the true rate n at high count rates
+#   non-paralyzable  m = n / (1 + n tau)    (pulses during tau are ignored)
+#   paralyzable      m = n exp(-n tau)      (pulses during tau restart it)
+# Fit your tube's dead time with capture_arrivals.py; 0 turns correction off
+# The host plot scripts correct with the same default (DEAD_TIME in
+# analysis/deadtime.py), so change both together
+DEAD_TIME = 0.0001  # seconds, typical of small tubes
+DEAD_TIME_MODEL = "nonparalyzable"  # or "paralyzable"
+
+
+def true_rate(rate, dead_time=DEAD_TIME, model=DEAD_TIME_MODEL):
+    # Invert the dead-time model for an observed rate (per second)
+    # Returns (true rate, d true / d observed) or None if no true rate
+    # could give the observed one
+    x = rate * dead_time
+    if model == "nonparalyzable":
+        if x >= 1:
+            return None
+        return rate / (1 - x), 1 / (1 - x) ** 2
+    if x > 1 / math.e:
+        return None
+    # Solve y exp(-y) = x for y = n tau < 1 with Newton's method
+    y = x / (1 - min(x, 0.5))
+    for _ in range(20):
+        step = (y * math.exp(-y) - x) / (math.exp(-y) * (1 - y) or 1e-9)
+        y = min(max(y - step, 0), 1)
+        if abs(step) <= 1e-9 * y:
+            break
+    n = y / dead_time if dead_time else rate
+    return n, math.exp(y) / max(1 - y, 1e-9)
+
+
+def rate_text(rate, error):
+    # "rate +/- error /s" to as many decimals as the error justifies, so it
+    # fits one 21 character line
+    if error >= 1:
+        return f"{rate:,.0f} +/- {error:,.0f} /s"
+    if error >= 0.1:
+        return f"{rate:,.1f} +/- {error:,.1f} /s"
+    return f"{rate:,.2f} +/- {error:,.2f} /s"
+
+
+def precision_text(n, target):
+    # The relative uncertainty of n counts against the target, likewise
+    # dropping the decimal once it reaches 10 %
+    percent = 100 / math.sqrt(n)
+    if percent >= 10:
+        return f"+/-{percent:.0f}% of {target * 100:.0f}% target"
+    return f"+/-{percent:.1f}% of {target * 100:.0f}% target"
+
+
+def done_text(error):
+    # The finished count's uncertainty, in whole counts (and without
+    # thousands separators) once it reaches 100
+    if round(error, 1) >= 100:
+        return f"Done: +/- {error:.0f} counts"
+    return f"Done: +/- {error:,.1f} counts"
+
+
+async def count_to_precision(target, min_seconds, max_seconds):
+    # Count until 1/sqrt(N) <= target (after at least min_seconds) or until
+    # max_seconds have passed, showing the live rate and its uncertainty
+    # Returns (total count, elapsed seconds) or None if aborted
+    with countio.Counter(board.A1, edge=countio.Edge.FALL) as pin_tick:
+        start = time.monotonic_ns()
+        deadline = start
+        start_count = pin_tick.count
+        for seconds in range(1, max_seconds + 1):
+            deadline += 1_000_000_000
+            if not await sleep_until(deadline):
+                return None
+            t0 = supervisor.ticks_ms()
+            n = pin_tick.count - start_count
+            elapsed = (time.monotonic_ns() - start) / 1e9
+            profile("countio", t0)
+            rate = n / elapsed
+            error = math.sqrt(n) / elapsed
+            display_line(1, rate_text(rate, error))
+            if n:
+                display_line(2, precision_text(n, target))
+            display_line(3, f"{max_seconds - seconds:3d} s max remain...")
+            if seconds >= min_seconds and n and 1 / math.sqrt(n) <= target:
+                break
+    return n, elapsed
+
+
+# Pulse time-of-arrival capture
+# A PIO state machine timestamps every falling edge on A1 with a 1 MHz
+# count-down timer in x, and counts the edges down in y. The firmware drains
+# its FIFO into a ring buffer and streams the raw x values to the host over
+# the USB data port in frames laid out like Lab 09's (all little-endian):
+#   header:  magic bytes 0xA5 0x5A, sequence number (uint16),
+#            number of timestamps in the frame (uint16)
+#   payload: x for each falling edge (uint32); the tick count is ~x and
+#            wraps every 2^32 us
+#   trailer: CRC32 of the header and payload (uint32)
+# The FIFO holds only 8 timestamps, and the firmware empties it between its
+# other tasks, so at high count rates some edges find it full and their
+# timestamps are lost. A capture therefore ends with a frame holding one
+# value, the number of edges the state machine saw (~y), and then a frame
+# with no timestamps
+TOA_TICK_HZ = const(1_000_000)
+TOA_FRAME_SIZE = const(64)
+TOA_RING_SIZE = const(1024)
+# Every path through the program takes two cycles per decrement of x, so x
+# counts down at exactly half the state machine's clock
+TOA_PROGRAM = adafruit_pioasm.assemble("""
+.program arrival_times
+idle:
+    jmp pin high        ; pin high: keep waiting for a falling edge
+    in x, 32            ; falling edge: record the time
+    push noblock        ; (lost if the FIFO is full)
+    jmp y-- fall0       ; count the edge either way
+fall0:
+    jmp x-- fall1
+fall1:
+    jmp x-- fall2
+fall2:
+    jmp x-- fall3
+fall3:
+    jmp x-- low
+low:
+    jmp pin rise        ; wait for the pin to go high again
+    jmp x-- low
+    jmp low             ; x wrapped past zero
+rise:
+    jmp x-- idle
+    jmp idle            ; x wrapped past zero
+high:
+    jmp x-- idle        ; x wrapped past zero: the program wraps to idle
+""")
+TOA_INIT = adafruit_pioasm.assemble("mov x, ~null\nmov y, ~null")
+# Run on the stopped state machine to read back its edge count
+TOA_READ_EDGES = adafruit_pioasm.assemble("in y, 32\npush")
+toa_edges = array("I", [0])
+TOA_MAGIC = b"\xa5\x5a"
+toa_header = bytearray(6)
+toa_trailer = bytearray(4)
+
+
+class ArrivalRing:
+    # Fixed size ring of PIO timestamps, filled straight from the state
+    # machine and sent from in place, so no pulse allocates any memory
+    def __init__(self, size):
+        self.data = array("I", [0] * size)
+        self.view = memoryview(self.data)
+        self.head = 0
+        self.length = 0
+        self.total = 0
+        self.dropped = 0
+
+    def fill(self, sm):
+        # Move every timestamp waiting in the FIFO into the ring
+        # Drops the oldest timestamps when the host is not keeping up
+        size = len(self.data)
+        waiting = sm.in_waiting
+        while waiting:
+            start = (self.head + self.length) % size
+            n = min(waiting, size - start)
+            sm.readinto(self.data, start=start, end=start + n)
+            waiting -= n
+            self.total += n
+            self.length += n
+            if self.length > size:
+                self.dropped += self.length - size
+                self.head = (self.head + self.length - size) % size
+                self.length = size
+
+    def send(self, ser, sequence, count):
+        # Send the oldest count timestamps as one frame and remove them
+        struct.pack_into("<2sHH", toa_header, 0, TOA_MAGIC, sequence, count)
+        ser.write(toa_header)
+        crc = binascii.crc32(toa_header)
+        while count:
+            n = min(count, len(self.data) - self.head)
+            chunk = self.view[self.head : self.head + n]
+            ser.write(chunk)
+            crc = binascii.crc32(chunk, crc)
+            self.head = (self.head + n) % len(self.data)
+            self.length -= n
+            count -= n
+        struct.pack_into("<I", toa_trailer, 0, crc)
+        ser.write(toa_trailer)
+        return (sequence + 1) & 0xFFFF
+
+    def append(self, value):
+        # Add one value to send after the timestamps (the ring must not be full)
+        self.data[(self.head + self.length) % len(self.data)] = value
+        self.length += 1
+
+    def clear(self):
+        self.head = 0
+        self.length = 0
+        self.total = 0
+        self.dropped = 0
+
+
+arrival_ring = ArrivalRing(TOA_RING_SIZE)
+
+
+async def capture_arrivals(flush_interval=0.25, poll_interval=0.005):
+    # Stream the time of every pulse to the host until Y is pressed
+    ser = usb_cdc.data
+    if ser is None:
+        display_line(1, "USB data port is off")
+        display_line(2, "(enable it in boot.py)")
+        await sleep_until(time.monotonic_ns() + 3_000_000_000)
+        return
+    ring = arrival_ring
+    ring.clear()
+    sequence = 0
+    display_line(0, "Capturing arrivals:")
+    display_line(3, "Press Y to stop")
+    with rp2pio.StateMachine(
+        TOA_PROGRAM,
+        frequency=2 * TOA_TICK_HZ,
+        init=TOA_INIT,
+        jmp_pin=board.A1,
+    ) as sm:
+        start = time.monotonic_ns()
+        last_flush = start
+        next_update = start
+        while pressed_button() != BUTTON_LEFT:  # Y to stop
+            t0 = supervisor.ticks_ms()
+            ring.fill(sm)
+            now = time.monotonic_ns()
+            # Send full frames as they fill, and any stragglers regularly
+            while ring.length >= TOA_FRAME_SIZE:
+                sequence = ring.send(ser, sequence, TOA_FRAME_SIZE)
+                last_flush = now
+            if ring.length and now - last_flush >= flush_interval * 1e9:
+                sequence = ring.send(ser, sequence, ring.length)
+                last_flush = now
+            profile("capture", t0)
+            if now >= next_update:
+                rate = ring.total / max(1, now - start) * 1e9
+                display_line(1, f"{ring.total:,} pulses")
+                display_line(2, f"{rate:,.1f} /s captured")
+                next_update += 1_000_000_000
+            await profiled_sleep("wake:capture", poll_interval)
+        # Stop the state machine so no more edges arrive, then ask it how
+        # many it saw, timestamped or not
+        sm.stop()
+        ring.fill(sm)
+        sm.run(TOA_READ_EDGES)
+        sm.readinto(toa_edges)
+    while ring.length:
+        sequence = ring.send(ser, sequence, min(ring.length, TOA_FRAME_SIZE))
+    edges = ~toa_edges[0] & 0xFFFFFFFF
+    captured = ring.total - ring.dropped
+    lost = max(0, edges - captured)
+    ring.append(edges)
+    sequence = ring.send(ser, sequence, 1)
+    # Let the host know the capture is complete
+    sequence = ring.send(ser, sequence, 0)
+    display_line(0, "Capture complete:")
+    display_line(1, f"{captured:,} captured")
+    display_line(2, f"{lost:,} lost")
+    display_line(3, "Press any button")
+    print(f"Captured {captured} of {edges} pulses, {lost} lost")
+    await next_button()
 
 
 async def run_geiger_counter():
     while True:
-        task = asyncio.create_task(flash_neopixel((0, 255, 0), 1))  # GREEN
+        set_pixel((0, 255, 0), 1)  # GREEN
         display_line(0, "Position mantle or")
         display_line(1, "insert welding rods")
-        display_line(2, "Press A to start test")
-        display_line(3, "or press Y to return")
+        display_line(2, "A: start  B: adaptive")
+        display_line(3, "X: capture Y: return")
         while True:
-            await asyncio.sleep(0)
-            button = read_buttons()
-            if button == BUTTON_RIGHT:  # A to start test
-                task.cancel()
-                pixel_builtin.fill((0, 0, 0))
+            button = await next_button()
+            if button in (BUTTON_RIGHT, BUTTON_DOWN, BUTTON_UP):  # A, B or X
+                set_pixel((0, 0, 0))
                 break
             if button == BUTTON_LEFT:  # Y to return
-                task.cancel()
-                pixel_builtin.fill((0, 0, 0))
+                set_pixel((0, 0, 0))
                 return
 
+        if button == BUTTON_UP:  # X to stream pulse times to the host
+            set_pixel((153, 102, 0))  # YELLOW
+            display_line(1, "")
+            display_line(2, "")
+            await capture_arrivals()
+            set_pixel((0, 0, 0))
+            continue
+        adaptive = button == BUTTON_DOWN  # B to count to a target precision
+
         # Measure decay events from Geiger Counter
-        task = asyncio.create_task(flash_neopixel((153, 102, 0), 100))  # YELLOW
+        set_pixel((153, 102, 0))  # YELLOW
         display_line(0, "Counting decay events:")
         display_line(1, "")
         display_line(2, "")
         display_line(3, "")
-        num_intervals = 6
         seconds_per_interval = 5
-        total_seconds = num_intervals * seconds_per_interval
-        counts = []
-        for n in range(num_intervals):
-            num_seconds = seconds_per_interval
-            with countio.Counter(board.A1, edge=countio.Edge.FALL) as pin_tick:
-                while num_seconds > 0:
-                    await asyncio.sleep(0)
-                    display_line(1, f"{total_seconds:2.0f} seconds remain...")
-                    total_seconds -= 1
-                    num_seconds -= 1
-                    time.sleep(1)
-                counts.append(pin_tick.count)
+        if adaptive:
+            result = await count_to_precision(
+                ADAPTIVE_TARGET, ADAPTIVE_MIN_SECONDS, ADAPTIVE_MAX_SECONDS
+            )
+            set_pixel((0, 0, 0))
+            if result is None:  # Y pressed to abort the run
+                continue
+            n, elapsed = result
+            # Report the count per interval, as in the fixed mode
+            c = n / elapsed * seconds_per_interval
+            error = math.sqrt(n) / elapsed * seconds_per_interval
+            print(f"Counted {n} events in {elapsed:.1f} s")
+        else:
+            num_intervals = 6
+            snapshots = await count_decay_events(num_intervals, seconds_per_interval)
+            set_pixel((0, 0, 0))
+            if snapshots is None:  # Y pressed to abort the run
+                continue
+            counts = interval_counts(snapshots)
             c = sum(counts) / len(counts)  # Average count per interval
-            display_line(2, f"Avg Count = {c:,.0f}")
-        task.cancel()
-        pixel_builtin.fill((0, 0, 0))
+            error = math.sqrt(sum(counts)) / len(counts)
+            print(f"Interval counts: {counts}")
 
-        task = asyncio.create_task(flash_neopixel((255, 0, 0), 0.25))  # RED
-        display_line(0, "Sampling period done:")
-        display_line(1, f"Avg Count = {c:,.0f}")
+        set_pixel((255, 0, 0), 0.25)  # RED
+        corrected = None
+        if DEAD_TIME:
+            corrected = true_rate(c / seconds_per_interval)
+        if corrected is None:
+            display_line(0, done_text(error))
+            display_line(1, f"Avg Count = {c:,.0f}")
+            if DEAD_TIME:
+                print("Count rate is beyond the dead-time model's range")
+        else:
+            # Students record the observed count; the host plot scripts
+            # correct it with the same default dead time when fitting
+            rate, slope = corrected
+            true_c = rate * seconds_per_interval
+            display_line(0, done_text(error * slope))
+            # No thousands separators, so six figure true counts still fit
+            display_line(1, f"Avg {c:.0f} True {true_c:.0f}")
+            print(
+                f"Observed {c / seconds_per_interval:,.2f} /s, true {rate:,.2f} /s"
+                f" ({DEAD_TIME * 1e6:.0f} us {DEAD_TIME_MODEL} dead time)"
+            )
         display_line(2, "Press A to continue")
         display_line(3, "or press Y to return")
         while True:
-            await asyncio.sleep(0)
-            button = read_buttons()
+            button = await next_button()
             if button == BUTTON_RIGHT:  # A to continue
-                task.cancel()
-                pixel_builtin.fill((0, 0, 0))
+                set_pixel((0, 0, 0))
                 break
             if button == BUTTON_LEFT:  # Y to return
-                task.cancel()
-                pixel_builtin.fill((0, 0, 0))
+                set_pixel((0, 0, 0))
                 return
 
 
@@ -198,18 +865,16 @@ async def display_wavelengths(readings):
     for i, v in enumerate(readings):
         w[i] = int(round(v, 2))
 
-    task = asyncio.create_task(flash_neopixel((255, 0, 0), 0.25))  # RED
+    set_pixel((255, 0, 0), 0.25)  # RED
     display_line(0, "Readings complete.")
     display_line(1, "Press A to cycle thru")
     display_line(2, "measured wavelengths")
     display_line(3, "or press Y to return")
     page = -1
     while True:
-        await asyncio.sleep(0)
-        button = read_buttons()
+        button = await next_button()
         if button == BUTTON_LEFT:  # Y to return
-            task.cancel()
-            pixel_builtin.fill((0, 0, 0))
+            set_pixel((0, 0, 0))
             return False
         if button == BUTTON_RIGHT:  # A to page wavelengths
             page += 1
@@ -232,26 +897,176 @@ async def display_wavelengths(readings):
                 display_line(3, "or press Y to return")
 
 
+# Order of the sensor's 18 channels by increasing wavelength
+WAVELENGTH_ORDER = (12, 13, 14, 15, 16, 17, 6, 7, 0, 8, 1, 9, 2, 3, 4, 5, 10, 11)
+# fmt: off
+WAVELENGTHS = (
+    410, 435, 460, 485, 510, 535, 560, 585, 610,
+    645, 680, 705, 730, 760, 810, 860, 900, 940,
+)
+# fmt: on
+
+
+class SpectrumStats:
+    # Running mean and variance of each channel (Welford's algorithm)
+    def __init__(self, channels=18):
+        self.count = 0
+        self.mean = array("f", [0.0] * channels)
+        self.m2 = array("f", [0.0] * channels)
+
+    def reset(self):
+        self.count = 0
+        for i in range(len(self.mean)):
+            self.mean[i] = 0.0
+            self.m2[i] = 0.0
+
+    def add(self, frame):
+        self.count += 1
+        for i in range(len(self.mean)):
+            delta = frame[i] - self.mean[i]
+            self.mean[i] += delta / self.count
+            self.m2[i] += delta * (frame[i] - self.mean[i])
+
+    def means(self):
+        # Mean of each channel ordered by increasing wavelength
+        return [self.mean[i] for i in WAVELENGTH_ORDER]
+
+    def stddevs(self):
+        # Sample standard deviation of each channel by increasing wavelength
+        if self.count < 2:
+            return [0.0] * len(self.mean)
+        return [math.sqrt(self.m2[i] / (self.count - 1)) for i in WAVELENGTH_ORDER]
+
+
+spectrum_frame = array("f", [0.0] * 18)
+spectrum_stats = SpectrumStats()
+
+
+async def acquire_burst(num_frames, stats, frame_timeout=1.0):
+    # Ask the sensor to report num_frames calibrated frames (ATCDATA format)
+    # back-to-back, one as soon as each integration cycle completes, and
+    # add each frame to the running statistics
+    # Returns False if the sensor stops reporting frames
+    flush_uart()
+    write_cmd(f"ATBURST={num_frames}")
+    while stats.count < num_frames:
+        length = await read_line(frame_timeout)
+        if length < 0:
+            write_cmd("ATBURST=0")  # Stop the burst
+            return False
+        # Every frame is a CSV line of 18 values with "OK" at the end
+        # (the "OK" acknowledging the ATBURST command itself has no values)
+        t0 = supervisor.ticks_ms()
+        n = parse_frame(uart_buffer, length, spectrum_frame)
+        consume_line(length)
+        profile("parse_frame", t0)
+        if n == len(spectrum_frame):
+            stats.add(spectrum_frame)
+            display_line(1, f"Frame {stats.count} of {num_frames}")
+    return True
+
+
+# Gain multipliers selected by ATGAIN=0 to ATGAIN=3
+SENSOR_GAINS = (1.0, 3.7, 16.0, 64.0)
+# Each ATINTTIME step lengthens the integration time by 2.8 ms
+INTTIME_STEP = 0.0028
+MAX_INTTIME = 255
+# Prefer a higher gain over integrating for longer than ~100 ms
+PREFERRED_INTTIME = 36
+# Raw ADC counts saturate at 65535, so aim the brightest channel at
+# about half scale and accept anything between a quarter and 3/4 scale
+RAW_FULL_SCALE = 65535
+RAW_TARGET = 32768
+RAW_LOW = 16384
+RAW_HIGH = 49152
+
+# Exposure settings are kept between runs so similar samples converge quickly
+exposure_gain = 2  # 16x
+exposure_inttime = 35  # 100 ms
+
+
+def choose_exposure(exposure):
+    # Return the (gain index, integration time) whose product of gain
+    # and integration steps is closest to (but not over) exposure
+    for g, gain in enumerate(SENSOR_GAINS):
+        inttime = int(exposure / gain)
+        if inttime <= PREFERRED_INTTIME:
+            return g, max(inttime, 1)
+    g = len(SENSOR_GAINS) - 1
+    return g, max(1, min(MAX_INTTIME, int(exposure / SENSOR_GAINS[g])))
+
+
+async def read_raw_frame(frame, timeout=1.0):
+    # Read the latest raw (uncalibrated) ADC counts of all 18 channels
+    flush_uart()
+    write_cmd("ATDATA")
+    length = await read_line(timeout)
+    if length < 0:
+        return False
+    n = parse_frame(uart_buffer, length, frame)
+    consume_line(length)
+    return n == len(frame)
+
+
+async def auto_expose(max_probes=4):
+    # Probe a frame and rescale the exposure until the brightest raw
+    # channel sits between RAW_LOW and RAW_HIGH
+    # Returns False if the sensor stops responding
+    global exposure_gain, exposure_inttime
+    for _ in range(max_probes):
+        cmds = (f"ATGAIN={exposure_gain}", f"ATINTTIME={exposure_inttime}")
+        if not await send_cmds(cmds):
+            return False
+        # Let one conversion with the old settings finish, then a full new one
+        await asyncio.sleep(2 * exposure_inttime * INTTIME_STEP + 0.02)
+        if not await read_raw_frame(spectrum_frame):
+            return False
+        peak = max(spectrum_frame)
+        if RAW_LOW <= peak <= RAW_HIGH:
+            break
+        exposure = SENSOR_GAINS[exposure_gain] * exposure_inttime
+        if peak >= RAW_FULL_SCALE:
+            exposure /= 4  # Saturated, so the true level is unknown
+        else:
+            exposure *= RAW_TARGET / max(peak, 1.0)
+        gain, inttime = choose_exposure(exposure)
+        if gain == exposure_gain and inttime == exposure_inttime:
+            break  # Already at the limit of the sensor's range
+        exposure_gain, exposure_inttime = gain, inttime
+    print(f"Exposure: ATGAIN={exposure_gain} ATINTTIME={exposure_inttime}")
+    return True
+
+
+async def show_sensor_error():
+    set_pixel((255, 0, 0), 0.25)  # RED
+    display_line(0, "Triad sensor is not")
+    display_line(1, "responding. Check it")
+    display_line(2, "is connected, then")
+    display_line(3, "press A to continue")
+    while True:
+        button = await next_button()
+        if button == BUTTON_RIGHT:  # A to continue
+            set_pixel((0, 0, 0))
+            return
+
+
 async def run_spectrophotometry():
     while True:
-        task = asyncio.create_task(flash_neopixel((0, 255, 0), 1))  # GREEN
+        set_pixel((0, 255, 0), 1)  # GREEN
         display_line(0, "Sample under table?")
         display_line(1, "Isolation lid closed?")
         display_line(2, "Press A to start test")
         display_line(3, "or press Y to return")
         while True:
-            await asyncio.sleep(0)
-            button = read_buttons()
+            button = await next_button()
             if button == BUTTON_RIGHT:  # A to start test
-                task.cancel()
-                pixel_builtin.fill((0, 0, 0))
+                set_pixel((0, 0, 0))
                 break
             if button == BUTTON_LEFT:  # Y to return
-                task.cancel()
-                pixel_builtin.fill((0, 0, 0))
+                set_pixel((0, 0, 0))
                 return
 
-        task = asyncio.create_task(flash_neopixel((153, 102, 0), 100))  # YELLOW
+        set_pixel((153, 102, 0))  # YELLOW
         display_line(0, "Reading wavelengths:")
         display_line(1, "")
         display_line(2, "")
@@ -259,111 +1074,134 @@ async def run_spectrophotometry():
 
         # Configure the sensor per the product's datasheet
         # See https://cdn.sparkfun.com/assets/learn_tutorials/8/3/0/AS7265x_Datasheet.pdf
-        send_cmd("ATINTTIME=35")  # Set 100ms integration time
-        send_cmd("ATGAIN=2")  # Set gain at 16x
-
-        # Set each of the three LEDs (WHT, IR, NIR) on the sesnor
-        # to use a 4mA indicator current and 500 mA driver current
-        send_cmd("ATLEDC=0x22")  # WHT (AS72651 sensor)
-        send_cmd("ATLEDD=0x22")  # IR  (AS72652 sensor)
-        send_cmd("ATLEDE=0x22")  # NIR LED (AS7265 sensor)
-
-        # Turn the blue indicator LED off on the sensor
-        # and turn on the other three indicator LEDs
-        send_cmd("ATLED0=0")  # Turn off blue indicator
-        send_cmd("ATLED1=1")  # Turn on WHT LED
-        send_cmd("ATLED2=1")  # Turn on IR LED
-        send_cmd("ATLED3=1")  # Turn on NIR LED
-
-        # Create list of 18 floats to hold the sum of each wavelength levels
-        total_readings = [0.0] * 18
-
-        # Perform 10 runs of the experiment
-        for n in range(1, 11):
-            display_line(1, f"{(22 - n * 2):2.0f} seconds remain...")
-            # Sleep for two seconds between each run to let sensors settle
-            await asyncio.sleep(2)
-            status = send_cmd("ATCDATA")  # Now read all 18 wavelength levels
-            # All successful commands return a string with "OK" at the end
-            # Remove the "OK" then split the CSV string into a list of 18 floats
-            readings = [float(s) for s in status.replace("OK", "").split(",")]
-            # Accumulate the readings for each wavelength over each run
-            for i in range(18):
-                total_readings[i] += readings[i]
+        config_cmds = (
+            "ATTCSMD=2",  # Continuously convert all channels
+            # Set each of the three LEDs (WHT, IR, NIR) on the sesnor
+            # to use a 4mA indicator current and 500 mA driver current
+            "ATLEDC=0x22",  # WHT (AS72651 sensor)
+            "ATLEDD=0x22",  # IR  (AS72652 sensor)
+            "ATLEDE=0x22",  # NIR LED (AS7265 sensor)
+            # Turn the blue indicator LED off on the sensor
+            # and turn on the other three indicator LEDs
+            "ATLED0=0",  # Turn off blue indicator
+            "ATLED1=1",  # Turn on WHT LED
+            "ATLED2=1",  # Turn on IR LED
+            "ATLED3=1",  # Turn on NIR LED
+        )
+        sensor_ok = await send_cmds(config_cmds)
+
+        # Pick the gain and integration time that suit this sample
+        if sensor_ok:
+            display_line(1, "Adjusting exposure...")
+            sensor_ok = await auto_expose()
+
+        # Stream frames from the sensor as each integration cycle completes
+        # (a well exposed sample needs far fewer frames for a good average)
+        num_frames = 4
+        spectrum_stats.reset()
+        if sensor_ok:
+            frame_timeout = 2 * exposure_inttime * INTTIME_STEP + 0.5
+            sensor_ok = await acquire_burst(num_frames, spectrum_stats, frame_timeout)
 
         # Return Sparkfun Triad Sensor to initial condition
-        send_cmd("ATLED1=0")  # Turn on WHT LED
-        send_cmd("ATLED2=0")  # Turn on IR LED
-        send_cmd("ATLED3=0")  # Turn on NIR LED
-        send_cmd("ATLED0=1")  # Turn off blue indicator
-
-        task.cancel()
-        pixel_builtin.fill((0, 0, 0))
-
-        # Calculate the average of each frequency level over 10 runs
-        # and reorder readings by increasing wavelength
-        sensor_readings = [
-            readings[i] / 10
-            for i in [12, 13, 14, 15, 16, 17, 6, 7, 0, 8, 1, 9, 2, 3, 4, 5, 10, 11]
-        ]
+        await send_cmds(
+            (
+                "ATLED1=0",  # Turn off WHT LED
+                "ATLED2=0",  # Turn off IR LED
+                "ATLED3=0",  # Turn off NIR LED
+                "ATLED0=1",  # Turn on blue indicator
+            )
+        )
+
+        set_pixel((0, 0, 0))
+
+        if not sensor_ok:
+            await show_sensor_error()
+            continue
+
+        # Average of each wavelength level over all frames, and its noise
+        sensor_readings = spectrum_stats.means()
+        sensor_stddevs = spectrum_stats.stddevs()
+        for i, w in enumerate(WAVELENGTHS):
+            print(f"{w} nm: {sensor_readings[i]:.2f} +/- {sensor_stddevs[i]:.2f}")
         await display_wavelengths(sensor_readings)
     return
 
 
+async def sample_current(num_samples):
+    # Read the current and bus voltage once per INA219 conversion
+    # Returns (mean amps, stddev amps, mean volts), or None if aborted
+    mean = 0.0
+    m2 = 0.0
+    v_total = 0.0
+    deadline = time.monotonic_ns()
+    for n in range(1, num_samples + 1):
+        deadline += INA219_CONVERSION_NS
+        if not await sleep_until(deadline):
+            return None
+        # Read both registers back-to-back, then update the statistics
+        t0 = supervisor.ticks_ms()
+        current = ina219.current / 1000  # Convert from milliamps to amps
+        v_total += ina219.bus_voltage
+        profile("ina219", t0)
+        delta = current - mean
+        mean += delta / n
+        m2 += delta * (current - mean)
+        # The OLED only refreshes a few times per second, so there is no
+        # point in updating the progress on every sample
+        if n % 10 == 0:
+            display_line(1, f"{num_samples - n:3.0f} samples remain...")
+    stddev = math.sqrt(m2 / (num_samples - 1)) if num_samples > 1 else 0.0
+    # The red wire connects the resistor from VIN- to ground, so the bus
+    # voltage is the voltage across the resistor
+    return mean, stddev, v_total / num_samples
+
+
 async def run_ohms_law():
     while True:
-        task = asyncio.create_task(flash_neopixel((0, 255, 0), 1))  # GREEN
+        set_pixel((0, 255, 0), 1)  # GREEN
         display_line(0, "Connect red wire to")
         display_line(1, "resistor to measure")
         display_line(2, "Press A to start test")
         display_line(3, "or press Y to return")
         while True:
-            await asyncio.sleep(0)
-            button = read_buttons()
+            button = await next_button()
             if button == BUTTON_RIGHT:  # A to start test
-                task.cancel()
-                pixel_builtin.fill((0, 0, 0))
+                set_pixel((0, 0, 0))
                 break
             if button == BUTTON_LEFT:  # Y to return
-                task.cancel()
-                pixel_builtin.fill((0, 0, 0))
+                set_pixel((0, 0, 0))
                 return
 
         # Measure current through selected resistor
-        task = asyncio.create_task(flash_neopixel((153, 102, 0), 100))  # YELLOW
-        num_samples = 100
+        set_pixel((153, 102, 0))  # YELLOW
+        num_samples = 50
         display_line(0, "Measuring current:")
         display_line(1, "")
         display_line(2, "")
         display_line(3, "")
-        n = num_samples
-        c = 0  # Total current
-        while n > 0:
-            await asyncio.sleep(0)
-            c += ina219.current
-            display_line(1, f"{n:3.0f} samples remain...")
-            n -= 1
-        # Calculate average current
-        c /= num_samples
-        c /= 1000  # Covert from milliamps to amps
-        task.cancel()
-        pixel_builtin.fill((0, 0, 0))
-
-        task = asyncio.create_task(flash_neopixel((255, 0, 0), 0.25))  # RED
+        result = await sample_current(num_samples)
+        set_pixel((0, 0, 0))
+        if result is None:  # Y pressed to abort the measurement
+            continue
+        c, c_stddev, v = result
+        print(f"Current = {c:0.6f} +/- {c_stddev:0.6f} A, Voltage = {v:0.4f} V")
+
+        set_pixel((255, 0, 0), 0.25)  # RED
         display_line(0, "!! UNPLUG RED WIRE !!")
         display_line(1, f"Current = {c:0.4f} A")
-        display_line(2, "Press A to continue")
-        display_line(3, "or press Y to return")
+        if c > 0:
+            display_line(2, f"R = {v / c:,.1f} Ohms")
+        else:
+            display_line(2, "R = open circuit")
+        display_line(3, "A: continue Y: return")
         while True:
-            await asyncio.sleep(0)
-            button = read_buttons()
+            button = await next_button()
             if button == BUTTON_RIGHT:  # A to continue
-                task.cancel()
-                pixel_builtin.fill((0, 0, 0))
+                set_pixel((0, 0, 0))
                 break
             if button == BUTTON_LEFT:  # Y to return
-                task.cancel()
-                pixel_builtin.fill((0, 0, 0))
+                set_pixel((0, 0, 0))
                 return
 
 
@@ -371,35 +1209,42 @@ async def select_experiment():
     exp_title = ["GEIGER COUNTER", "SPECTROPHOTOMETRY", "OHM'S LAW"]
     exp_num = 1
     while True:
-        task = asyncio.create_task(flash_neopixel((0, 0, 255), 1))  # BLUE
+        set_pixel((0, 0, 255), 1)  # BLUE
         display_line(0, "Cycle the experiments")
         display_line(1, "using the B button...")
         display_line(2, "Select with A button:")
         display_line(3, f"{exp_title[exp_num]}")
         while True:
-            await asyncio.sleep(0)
-            button = read_buttons()
+            button = await next_button()
             if button == BUTTON_DOWN:  # B to cycle
                 exp_num += 1
                 if exp_num == len(exp_title):
                     exp_num = 0
                 display_line(3, f"{exp_title[exp_num]}")
-                time.sleep(0.5)
             if button == BUTTON_RIGHT:  # A to start experiment
-                task.cancel()
-                pixel_builtin.fill((0, 0, 0))
+                set_pixel((0, 0, 0))
                 break
             if button == BUTTON_UP:  # X to get system information
                 display_line(0, f"code.py ver: {VERSION_NUM}")
                 v = sys.implementation[1]
                 display_line(1, f"CP ver: {v[0]}.{v[1]}.{v[2]}")
                 display_line(2, f"Battery: {battery_monitor.cell_percent:.1f} %")
-                display_line(3, "Press Y to return")
+                display_line(3, "B: profile Y: return")
+                print_profile()
+                page = -1
                 while True:
-                    await asyncio.sleep(0)
-                    button = read_buttons()
+                    button = await next_button()
                     if button == BUTTON_LEFT:  # Y
                         break
+                    if button == BUTTON_DOWN:  # B to page profiling statistics
+                        lines = profile_lines()
+                        page += 1
+                        if page * 3 >= len(lines):
+                            page = 0
+                        for i in range(3):
+                            n = page * 3 + i
+                            display_line(i, lines[n] if n < len(lines) else "")
+                        display_line(3, "B: more  Y: return")
                 display_line(0, "Cycle the experiments")
                 display_line(1, "using the B button...")
                 display_line(2, "Select with A button:")
@@ -416,6 +1261,10 @@ async def select_experiment():
 
 async def main():
     init_screen()
+    asyncio.create_task(refresh_screen())
+    asyncio.create_task(poll_buttons())
+    asyncio.create_task(run_neopixel())
+    asyncio.create_task(watch_memory())
     await select_experiment()
 
 
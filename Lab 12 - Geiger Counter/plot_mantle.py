@@ -1,61 +1,88 @@
 # plot_mantle.py
+# Fit decay events against distance from the mantle and plot them
+#
+#   python plot_mantle.py                     # fit and show the plot
+#   python plot_mantle.py --no-plot           # just print the fits
+#   python plot_mantle.py --save mantle.png   # save the plot, no window
 
 
-import matplotlib.pyplot as plt
-from matplotlib.ticker import MultipleLocator
+import argparse
+import sys
+from pathlib import Path
 import numpy as np
-from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import PolynomialFeatures
-
-
-def fit_linear(vec_x, vec_y):
-    vec_x = vec_x.reshape(-1, 1)
-    model = LinearRegression().fit(vec_x, vec_y)
-    m = model.coef_
-    b = model.intercept_
-    score = model.score(vec_x, vec_y)
-    return m, b, score
-
-
-def fit_quadratic(vec_x, vec_y):
-    vec_x = vec_x.reshape(-1, 1)
-    transformer = PolynomialFeatures(degree=2, include_bias=False)
-    transformer.fit(vec_x)
-    vec_x2 = transformer.transform(vec_x)
-    model = LinearRegression().fit(vec_x2, vec_y)
-    b, a = model.coef_
-    c = model.intercept_
-    score = model.score(vec_x2, vec_y)
-    return a, b, c, score
-
-
-# Load the data file and parse into columns
-counts = np.loadtxt("mantle.txt")
-
-# Calculate the distance for each count reading
-# Note that each single 1x Lego block is 8mm wide
-dist = np.arange(len(counts), 0, -1) * 8 - 8
-
-# Plot the data and two curves fitted to the data
-plt.figure("plot_distance.py")
-plt.scatter(dist, counts, color="red")
-# Fit a straight line
-m, b, score = fit_linear(dist, counts)
-x = np.linspace(np.min(dist), np.max(dist), 500)
-plt.plot(
-    x, m * x + b, color="green", linestyle="--", label=f"Linear ($R^2$={score:.4f})"
-)
-# Fit a quadratic
-a, b, c, score = fit_quadratic(dist, counts)
-plt.plot(
-    x, a * x**2 + b * x + c, color="blue", label=f"Quadratic ($R^2$={score:.4f})"
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from analysis import (  # noqa: E402
+    COUNT_SECONDS,
+    add_dead_time_arguments,
+    dead_time_from,
+    describe_correction,
+    describe_fit,
+    draw_fits,
+    finish,
+    mantle_distances,
+    polyfit,
+    pyplot,
+    true_counts,
 )
-# Decorate the plot with title, axis labels, etc.
-plt.title("Decay Events By Distance")
-plt.xlabel("Distance (mm)")
-plt.ylabel("Number of Events")
-plt.legend()
-plt.xlim(-1, np.max(dist) + 1)
-plt.ylim(0)
-plt.gca().xaxis.set_minor_locator(MultipleLocator(2))
-plt.show()
+
+DATA_FILE = Path(__file__).parent / "mantle.txt"
+
+
+def load(path=DATA_FILE):
+    # Load the data file and calculate the distance for each count reading
+    # Note that each single 1x Lego block is 8mm wide
+    counts = np.loadtxt(path)
+    return mantle_distances(len(counts)), counts
+
+
+def fit(dist, counts):
+    # Fit a straight line and a quadratic
+    return polyfit(dist, counts, 1), polyfit(dist, counts, 2)
+
+
+def plot(dist, counts, fits, save=None, observed=None):
+    # Plot the data and two curves fitted to the data
+    plt = pyplot(save)
+    from matplotlib.ticker import MultipleLocator
+
+    plt.figure("plot_distance.py")
+    draw_fits(plt.gca(), dist, counts, fits, observed=observed)
+    # Decorate the plot with title, axis labels, etc.
+    plt.title("Decay Events By Distance")
+    plt.xlabel("Distance (mm)")
+    plt.ylabel("Number of Events")
+    plt.legend()
+    plt.xlim(-1, np.max(dist) + 1)
+    plt.ylim(0)
+    plt.gca().xaxis.set_minor_locator(MultipleLocator(2))
+    finish(plt, save)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit decay events by distance")
+    parser.add_argument("data", nargs="?", type=Path, default=DATA_FILE)
+    parser.add_argument("--no-plot", action="store_true", help="only print the fits")
+    parser.add_argument("--save", type=Path, help="save the plot here (PNG, PDF, ...)")
+    add_dead_time_arguments(parser)
+    args = parser.parse_args()
+
+    dist, counts = load(args.data)
+    observed = None
+    dead_time = dead_time_from(args)
+    if dead_time:
+        # Fit the true counts, as dead time bends the curve at high rates
+        observed = counts
+        counts = true_counts(observed, COUNT_SECONDS, dead_time, args.model)
+        print(f"Correcting for {dead_time * 1e6:.0f} us {args.model} dead time:")
+        for line in describe_correction(observed, dead_time, args.model):
+            print(line)
+    fits = fit(dist, counts)
+    for f in fits:
+        print(describe_fit(f))
+    if not args.no_plot:
+        plot(dist, counts, fits, args.save, observed)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,61 +1,88 @@
 # plot_rods.py
+# Fit decay events against the number of rods and plot them
+#
+#   python plot_rods.py                     # fit and show the plot
+#   python plot_rods.py --no-plot           # just print the fits
+#   python plot_rods.py --save rods.png     # save the plot, no window
 
 
-import matplotlib.pyplot as plt
-from matplotlib.ticker import MultipleLocator
+import argparse
+import sys
+from pathlib import Path
 import numpy as np
-from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import PolynomialFeatures
-
-
-def fit_linear(vec_x, vec_y):
-    vec_x = vec_x.reshape(-1, 1)
-    model = LinearRegression().fit(vec_x, vec_y)
-    m = model.coef_
-    b = model.intercept_
-    score = model.score(vec_x, vec_y)
-    return m, b, score
-
-
-def fit_quadratic(vec_x, vec_y):
-    vec_x = vec_x.reshape(-1, 1)
-    transformer = PolynomialFeatures(degree=2, include_bias=False)
-    transformer.fit(vec_x)
-    vec_x2 = transformer.transform(vec_x)
-    model = LinearRegression().fit(vec_x2, vec_y)
-    b, a = model.coef_
-    c = model.intercept_
-    score = model.score(vec_x2, vec_y)
-    return a, b, c, score
-
-
-# Load the data file and parse into columns
-counts = np.loadtxt("rods.txt")
-
-# Calculate the number of rods for each reading
-# Note that each reading added two more rods
-rods = np.arange(len(counts)) * 2 + 2
-
-# Plot the data and two curves fitted to the data
-plt.figure("plot_rods.py")
-plt.scatter(rods, counts, color="red")
-# Fit a straight line
-m, b, score = fit_linear(rods, counts)
-x = np.linspace(np.min(rods), np.max(rods), 500)
-plt.plot(
-    x, m * x + b, color="green", linestyle="--", label=f"Linear ($R^2$={score:.4f})"
-)
-# Fit a quadratic
-a, b, c, score = fit_quadratic(rods, counts)
-plt.plot(
-    x, a * x**2 + b * x + c, color="blue", label=f"Quadratic ($R^2$={score:.4f})"
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from analysis import (  # noqa: E402
+    COUNT_SECONDS,
+    add_dead_time_arguments,
+    dead_time_from,
+    describe_correction,
+    describe_fit,
+    draw_fits,
+    finish,
+    polyfit,
+    pyplot,
+    rod_numbers,
+    true_counts,
 )
-# Decorate the plot with title, axis labels, etc.
-plt.title("Decay Events Per Rod")
-plt.xlabel("Number of Rods")
-plt.ylabel("Number of Events")
-plt.legend()
-plt.xlim(0, np.max(rods) + 1)
-plt.ylim(0)
-plt.gca().xaxis.set_major_locator(MultipleLocator(1))
-plt.show()
+
+DATA_FILE = Path(__file__).parent / "rods.txt"
+
+
+def load(path=DATA_FILE):
+    # Load the data file and calculate the number of rods for each reading
+    # Note that each reading added two more rods
+    counts = np.loadtxt(path)
+    return rod_numbers(len(counts)), counts
+
+
+def fit(rods, counts):
+    # Fit a straight line and a quadratic
+    return polyfit(rods, counts, 1), polyfit(rods, counts, 2)
+
+
+def plot(rods, counts, fits, save=None, observed=None):
+    # Plot the data and two curves fitted to the data
+    plt = pyplot(save)
+    from matplotlib.ticker import MultipleLocator
+
+    plt.figure("plot_rods.py")
+    draw_fits(plt.gca(), rods, counts, fits, observed=observed)
+    # Decorate the plot with title, axis labels, etc.
+    plt.title("Decay Events Per Rod")
+    plt.xlabel("Number of Rods")
+    plt.ylabel("Number of Events")
+    plt.legend()
+    plt.xlim(0, np.max(rods) + 1)
+    plt.ylim(0)
+    plt.gca().xaxis.set_major_locator(MultipleLocator(1))
+    finish(plt, save)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit decay events per rod")
+    parser.add_argument("data", nargs="?", type=Path, default=DATA_FILE)
+    parser.add_argument("--no-plot", action="store_true", help="only print the fits")
+    parser.add_argument("--save", type=Path, help="save the plot here (PNG, PDF, ...)")
+    add_dead_time_arguments(parser)
+    args = parser.parse_args()
+
+    rods, counts = load(args.data)
+    observed = None
+    dead_time = dead_time_from(args)
+    if dead_time:
+        # Fit the true counts, as dead time bends the curve at high rates
+        observed = counts
+        counts = true_counts(observed, COUNT_SECONDS, dead_time, args.model)
+        print(f"Correcting for {dead_time * 1e6:.0f} us {args.model} dead time:")
+        for line in describe_correction(observed, dead_time, args.model):
+            print(line)
+    fits = fit(rods, counts)
+    for f in fits:
+        print(describe_fit(f))
+    if not args.no_plot:
+        plot(rods, counts, fits, args.save, observed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+# analysis
+# Data analysis shared by the labs' host-side plotting scripts
+
+from analysis.deadtime import (
+    COUNT_INTERVALS,
+    COUNT_SECONDS,
+    DEAD_TIME,
+    DeadTimeFit,
+    MODELS,
+    add_dead_time_arguments,
+    check_model,
+    dead_time_from,
+    describe_correction,
+    fit_dead_time,
+    observed_rate,
+    true_counts,
+    true_rate,
+    true_rate_error,
+)
+from analysis.frames import FRAME_MAGIC, open_port, read_frame, read_run
+from analysis.experiments import EXPERIMENTS, mantle_distances, rod_numbers
+from analysis.fitting import Fit, fit_at, polyfit, polyval
+from analysis.plotting import describe_fit, draw_fits, finish, pyplot
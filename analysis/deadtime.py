@@ -0,0 +1,160 @@
+# deadtime.py
+# Geiger tube dead-time correction, using NumPy only
+# After each pulse the tube is blind for the dead time tau, so the observed
+# rate m falls below the true rate n as the source gets hotter:
+#   non-paralyzable  m = n / (1 + n tau)    (pulses during tau are ignored)
+#   paralyzable      m = n exp(-n tau)      (pulses during tau restart it)
+#
+#   rate = true_rate(counts / 5, DEAD_TIME)         # rates in counts per second
+#   counts = true_counts(counts, COUNT_SECONDS, DEAD_TIME)
+#   fit = fit_dead_time(np.loadtxt("DaveB - arrivals.txt"))
+
+from collections import namedtuple
+from pathlib import Path
+
+import numpy as np
+
+MODELS = ("nonparalyzable", "paralyzable")
+# The dead time the Geiger firmware corrects with by default; keep it the
+# same as DEAD_TIME in the Lab 11/12 code.py so the board and the plot
+# scripts agree
+DEAD_TIME = 100e-6  # seconds
+# The Geiger firmware reports the average count per 5 second interval,
+# over six intervals
+COUNT_SECONDS = 5
+COUNT_INTERVALS = 6
+
+# dead_time and stderr in seconds, rates in counts per second
+DeadTimeFit = namedtuple(
+    "DeadTimeFit", ["dead_time", "stderr", "observed_rate", "true_rate"]
+)
+
+
+def check_model(model):
+    if model not in MODELS:
+        raise ValueError(f"Unknown dead-time model {model!r}, expected one of {MODELS}")
+
+
+def observed_rate(rate, dead_time, model="nonparalyzable"):
+    # The rate a counter with this dead time sees for a true rate
+    check_model(model)
+    rate = np.asarray(rate, dtype=np.float64)
+    if model == "nonparalyzable":
+        return rate / (1.0 + rate * dead_time)
+    return rate * np.exp(-rate * dead_time)
+
+
+def true_rate(rate, dead_time, model="nonparalyzable"):
+    # Invert observed_rate(); rates a paralyzable counter can never observe
+    # (above 1 / (e tau)) and non-paralyzable rates at or above 1 / tau are NaN
+    check_model(model)
+    m = np.asarray(rate, dtype=np.float64)
+    x = m * dead_time
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if model == "nonparalyzable":
+            return np.where(x < 1.0, m / (1.0 - x), np.nan)
+        if dead_time == 0:
+            return m
+        # Solve y exp(-y) = x for y = n tau on the branch y < 1 by Newton's
+        # method, starting from the non-paralyzable answer (always below it)
+        possible = x <= 1.0 / np.e
+        y = np.where(possible, x / (1.0 - np.minimum(x, 0.5)), 0.0)
+        for _ in range(50):
+            f = y * np.exp(-y) - x
+            step = np.where(possible, f / (np.exp(-y) * (1.0 - y)), 0.0)
+            y = np.clip(y - step, 0.0, 1.0)
+            if np.all(np.abs(step) <= 1e-12 * np.maximum(y, 1e-300)):
+                break
+        return np.where(possible, y / dead_time, np.nan)
+
+
+def true_rate_error(rate, error, dead_time, model="nonparalyzable"):
+    # Propagate the observed rate's uncertainty through true_rate()
+    n = true_rate(rate, dead_time, model)
+    y = n * dead_time
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if model == "nonparalyzable":
+            slope = (1.0 + y) ** 2
+        else:
+            slope = np.exp(y) / (1.0 - y)
+    return np.asarray(error, dtype=np.float64) * slope
+
+
+def true_counts(counts, seconds, dead_time, model="nonparalyzable"):
+    # Correct counts taken over intervals of the given length
+    return true_rate(np.asarray(counts) / seconds, dead_time, model) * seconds
+
+
+def fit_dead_time(times, model="nonparalyzable"):
+    # Fit the dead time to a list of pulse arrival times in seconds
+    # With a non-paralyzable dead time the intervals between recorded pulses
+    # are tau plus an exponential; a paralyzable one also never records two
+    # pulses closer than tau. Either way tau is the shortest interval, and
+    # the maximum likelihood fit of the shifted exponential corrects the
+    # shortest interval seen for the run's length.
+    check_model(model)
+    intervals = np.diff(np.sort(np.asarray(times, dtype=np.float64)))
+    n = len(intervals)
+    if n < 2:
+        raise ValueError("Need at least three pulse times to fit a dead time")
+    shortest = float(intervals.min())
+    excess = float(intervals.mean()) - shortest
+    dead_time = max(shortest - excess / (n - 1), 0.0)
+    rate = 1.0 / float(intervals.mean())
+    return DeadTimeFit(
+        dead_time, excess / n, rate, float(true_rate(rate, dead_time, model))
+    )
+
+
+def describe_correction(
+    observed,
+    dead_time,
+    model="nonparalyzable",
+    seconds=COUNT_SECONDS,
+    intervals=COUNT_INTERVALS,
+):
+    # One line per reading comparing the observed and true rates, with the
+    # Poisson uncertainty of each (readings average intervals counts)
+    observed = np.asarray(observed, dtype=np.float64)
+    rates = observed / seconds
+    errors = np.sqrt(observed * intervals) / (intervals * seconds)
+    true = true_rate(rates, dead_time, model)
+    true_errors = true_rate_error(rates, errors, dead_time, model)
+    lines = []
+    for m, dm, n, dn in zip(rates, errors, true, true_errors):
+        lines.append(
+            f"{m:9.2f} ± {dm:5.2f} /s observed  {n:9.2f} ± {dn:5.2f} /s true"
+            f"  (+{n / m - 1:.2%})"
+        )
+    return lines
+
+
+def add_dead_time_arguments(parser, arrivals=True):
+    # The command line options shared by the Geiger plot scripts
+    parser.add_argument(
+        "--dead-time",
+        type=float,
+        default=DEAD_TIME,
+        help="tube dead time in seconds to correct the counts for, 0 for none "
+        f"(default: {DEAD_TIME:g}, as on the board)",
+    )
+    if arrivals:
+        parser.add_argument(
+            "--arrivals",
+            type=Path,
+            help="fit the dead time to pulse times saved by capture_arrivals.py",
+        )
+    parser.add_argument("--model", choices=MODELS, default=MODELS[0])
+
+
+def dead_time_from(args):
+    # The dead time to correct with: fitted when arrival times are given
+    if args.arrivals is None:
+        return args.dead_time
+    fit = fit_dead_time(np.loadtxt(args.arrivals), args.model)
+    print(
+        f"Dead time = {fit.dead_time * 1e6:.1f} ± {fit.stderr * 1e6:.1g} us "
+        f"from {args.arrivals.name} ({fit.observed_rate:.2f} /s observed, "
+        f"{fit.true_rate:.2f} /s true)"
+    )
+    return fit.dead_time
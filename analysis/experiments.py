@@ -0,0 +1,23 @@
+# experiments.py
+# Where each Lab 12 Geiger counter reading was taken, by its position in a
+# student's data file, shared by the plot scripts, the batch report and the
+# Monte Carlo simulator
+
+import numpy as np
+
+
+def mantle_distances(num_readings):
+    # Readings move one 8 mm Lego block closer each time, ending at 0 mm
+    return np.arange(num_readings, 0, -1) * 8 - 8
+
+
+def rod_numbers(num_readings):
+    # Each reading adds two more rods
+    return np.arange(num_readings) * 2 + 2
+
+
+# Experiments by data file suffix, as (x axis label, x values for n readings)
+EXPERIMENTS = {
+    "mantle": ("Distance (mm)", mantle_distances),
+    "rods": ("Number of Rods", rod_numbers),
+}
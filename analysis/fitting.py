@@ -0,0 +1,71 @@
+# fitting.py
+# Least-squares polynomial fits for the lab plotting scripts, using NumPy only
+# Fits a whole stack of datasets at once: y can be (n,) or (..., n), and x
+# either one shared (n,) array or the same shape as y. NaN readings are left
+# out, so datasets of different lengths can be padded into one array; one
+# with too few readings for the degree gets an all-NaN fit of its own.
+#
+#   fit = polyfit(dist, counts, 2)
+#   fit.coeffs, fit.stderr, fit.r2      # highest power first, like np.polyfit
+
+from collections import namedtuple
+
+import numpy as np
+
+# coeffs and stderr have shape (..., degree + 1), r2 and dof have shape (...)
+Fit = namedtuple("Fit", ["coeffs", "stderr", "r2", "dof"])
+
+
+def polyfit(x, y, degree):
+    y = np.asarray(y, dtype=np.float64)
+    x = np.broadcast_to(np.asarray(x, dtype=np.float64), y.shape)
+    valid = ~(np.isnan(x) | np.isnan(y))
+    # Missing readings become all-zero rows, which leave the fit unchanged
+    x = np.where(valid, x, 0.0)
+    y = np.where(valid, y, 0.0)
+    powers = np.arange(degree, -1, -1)
+    design = (x[..., None] ** powers) * valid[..., None]
+
+    # One batched QR solve for every dataset: design = Q R, R coeffs = Q^T y
+    q, r = np.linalg.qr(design)
+    qty = np.einsum("...nk,...n->...k", q, y)
+    # A dataset with too few distinct x values for the degree has a singular
+    # R (as in np.linalg.matrix_rank); it gets NaN for its whole fit, and the
+    # identity in its place so the rest of the batch can still be solved
+    diagonal = np.abs(np.diagonal(r, axis1=-2, axis2=-1))
+    tolerance = diagonal.max(axis=-1, initial=0.0) * max(design.shape[-2:])
+    solvable = np.all(diagonal > tolerance[..., None] * np.finfo(float).eps, axis=-1)
+    r = np.where(solvable[..., None, None], r, np.eye(degree + 1))
+    coeffs = np.linalg.solve(r, qty[..., None])[..., 0]
+    coeffs = np.where(solvable[..., None], coeffs, np.nan)
+
+    residuals = (y - np.einsum("...nk,...k->...n", design, coeffs)) * valid
+    ssr = np.sum(residuals**2, axis=-1)
+    count = np.sum(valid, axis=-1)
+    dof = count - (degree + 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = np.sum(y, axis=-1) / count
+        sst = np.sum(((y - mean[..., None]) * valid) ** 2, axis=-1)
+        r2 = 1.0 - ssr / sst
+        # Covariance of the coefficients is sigma^2 (R^T R)^-1
+        sigma2 = np.where(dof > 0, ssr / dof, np.nan)
+        r_inv = np.linalg.inv(r)
+        variance = np.sum(r_inv**2, axis=-1) * sigma2[..., None]
+    return Fit(coeffs, np.sqrt(variance), r2, dof)
+
+
+def fit_at(fit, index):
+    # One dataset's fit out of a batch
+    return Fit(*(values[index] for values in fit))
+
+
+def polyval(coeffs, x):
+    # Evaluate fitted polynomials at x; coeffs of shape (..., degree + 1)
+    # give results of shape (...) + x.shape
+    coeffs = np.asarray(coeffs, dtype=np.float64)
+    x = np.asarray(x, dtype=np.float64)
+    coeffs = coeffs.reshape(coeffs.shape[:-1] + (1,) * x.ndim + coeffs.shape[-1:])
+    result = np.zeros(coeffs.shape[:-1])
+    for k in range(coeffs.shape[-1]):
+        result = result * x + coeffs[..., k]
+    return result
@@ -0,0 +1,78 @@
+# frames.py
+# Read the CRC-checked binary frames the lab boards stream over USB
+# Every frame is laid out the same way (all little-endian):
+#   header:  magic bytes 0xA5 0x5A, sequence number (uint16),
+#            number of records in the frame (uint16)
+#   payload: the records, as laid out by the board's dtype
+#   trailer: CRC32 of the header and payload (uint32)
+# and a frame with no records ends a run
+#
+#   ser = open_port()
+#   samples = read_run(ser, SAMPLE_DTYPE)
+
+import struct
+import zlib
+
+import numpy as np
+
+FRAME_MAGIC = b"\xa5\x5a"
+
+
+def open_port(device=None, timeout=120):
+    # Open the USB data port (the first board's unless device is given)
+    # timeout=None waits for data forever
+    import adafruit_board_toolkit.circuitpython_serial
+    import serial
+
+    if device is None:
+        device = adafruit_board_toolkit.circuitpython_serial.data_comports()[0].device
+    port = serial.Serial(None, 115200, 8, "N", 1, timeout=timeout)
+    port.port = device
+    port.open()
+    return port
+
+
+def usb_read(ser, num_bytes):
+    data = ser.read(num_bytes)
+    if len(data) < num_bytes:
+        raise TimeoutError("Timed out waiting for the board")
+    return data
+
+
+def read_frame(ser, dtype):
+    # Return the next valid frame as (sequence number, records array)
+    # Skips ahead to the next magic bytes after any corrupted frame
+    dtype = np.dtype(dtype)
+    while True:
+        if usb_read(ser, 1) != FRAME_MAGIC[:1] or usb_read(ser, 1) != FRAME_MAGIC[1:]:
+            continue
+        header = usb_read(ser, 4)
+        sequence, count = struct.unpack("<HH", header)
+        payload = usb_read(ser, count * dtype.itemsize)
+        (crc,) = struct.unpack("<I", usb_read(ser, 4))
+        if zlib.crc32(FRAME_MAGIC + header + payload) != crc:
+            print(f"Discarding corrupted frame #{sequence}")
+            continue
+        return sequence, np.frombuffer(payload, dtype=dtype)
+
+
+def read_run(ser, dtype, progress=None):
+    # Collect every record of a run, up to the empty end-of-run frame
+    # progress, if given, is called with the number of records so far
+    frames = []
+    received = 0
+    expected = None
+    while True:
+        sequence, records = read_frame(ser, dtype)
+        if expected is not None and sequence != expected:
+            print(f"Missing frames #{expected} to #{sequence - 1}")
+        expected = (sequence + 1) & 0xFFFF
+        if len(records) == 0:
+            break
+        frames.append(records)
+        received += len(records)
+        if progress is not None:
+            progress(received)
+    if not frames:
+        return np.empty(0, dtype=dtype)
+    return np.concatenate(frames)
@@ -0,0 +1,62 @@
+# plotting.py
+# Helpers for the plot scripts that keep matplotlib out of fit-only runs
+# Nothing here imports matplotlib until a figure is actually wanted
+
+import numpy as np
+
+from analysis.fitting import polyval
+
+FIT_NAMES = {1: "Linear", 2: "Quadratic", 3: "Cubic"}
+# Line styles for the first, second, ... fit on a plot
+FIT_STYLES = (
+    {"color": "green", "linestyle": "--"},
+    {"color": "blue"},
+    {"color": "purple", "linestyle": ":"},
+)
+
+
+def pyplot(save=False):
+    # Import pyplot, on the non-interactive Agg backend when only saving
+    import matplotlib
+
+    if save:
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    return plt
+
+
+def finish(plt, save=None):
+    # Save the current figure to save, or show it in a window
+    if save:
+        plt.savefig(save)
+        print(f"Saved {save}")
+    else:
+        plt.show()
+
+
+def fit_name(fit):
+    degree = len(fit.coeffs) - 1
+    return FIT_NAMES.get(degree, f"Degree {degree}")
+
+
+def describe_fit(fit):
+    # One line with a fit's coefficients, their standard errors and R^2
+    degree = len(fit.coeffs) - 1
+    terms = []
+    for power, (coeff, err) in zip(range(degree, -1, -1), zip(fit.coeffs, fit.stderr)):
+        x = "" if power == 0 else "x" if power == 1 else f"x^{power}"
+        terms.append(f"({coeff:.5g} ± {err:.2g}){x}")
+    return f"{fit_name(fit):>9s}: y = {' + '.join(terms)}  R^2 = {fit.r2:.4f}"
+
+
+def draw_fits(ax, x, y, fits, styles=FIT_STYLES, observed=None):
+    # Scatter the data and draw each fit across its range with its R^2
+    # observed are the uncorrected readings, when y has been corrected
+    smooth = np.linspace(np.min(x), np.max(x), 500)
+    if observed is not None:
+        ax.scatter(x, observed, facecolors="none", edgecolors="gray", label="Observed")
+    ax.scatter(x, y, color="red")
+    for fit, style in zip(fits, styles):
+        label = f"{fit_name(fit)} ($R^2$={fit.r2:.4f})"
+        ax.plot(smooth, polyval(fit.coeffs, smooth), label=label, **style)
@@ -0,0 +1,335 @@
+# bench_firmware.py
+# Benchmark the Lab 11/12 firmware hot paths against the simulated hardware
+# Writes a JSON report keyed by the firmware's VERSION_NUM and git revision,
+# and can compare it with an earlier report to catch regressions before
+# flashing boards. Only the deterministic metrics (virtual time, memory,
+# wake latency and count accuracy) can fail the comparison; wall-clock times
+# vary from run to run and are printed for information only
+#
+#   python benchmarks/bench_firmware.py --output report.json
+#   python benchmarks/bench_firmware.py --compare report.json
+
+import argparse
+import asyncio
+import inspect
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import sim  # noqa: E402
+from sim.geiger import GeigerPulses  # noqa: E402
+
+DEFAULT_FIRMWARE = ROOT / "Lab 12 - Geiger Counter" / "code.py"
+
+# Metrics where a bigger number is worse. The simulated clock makes these
+# the same on every run of the same firmware, so they gate the comparison
+LOWER_IS_BETTER = (
+    "virtual_us_per_op",
+    "alloc_peak_bytes",
+    "retained_bytes",
+    "virtual_seconds",
+    "max_wake_ms",
+    "avg_wake_ms",
+    "count_error",
+)
+# Wall-clock metrics depend on the PC's load, so changes are only reported
+WALL_CLOCK = ("us_per_op", "wall_seconds")
+
+
+def measure(function, ops):
+    # Time ops calls of a plain function in wall and virtual time, and
+    # track the memory they allocate
+    clock = sim.current().clock
+    function()  # Warm up
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    virtual_start = clock.monotonic_ns()
+    wall_start = time.perf_counter()
+    for _ in range(ops):
+        function()
+    wall = time.perf_counter() - wall_start
+    virtual = clock.monotonic_ns() - virtual_start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "ops": ops,
+        "ops_per_sec": ops / wall,
+        "us_per_op": wall / ops * 1e6,
+        "virtual_us_per_op": virtual / ops / 1000,
+        "alloc_peak_bytes": peak - baseline,
+        "retained_bytes": current - baseline,
+    }
+
+
+def wake_latency(firmware):
+    # Summarize how late the firmware's coroutines woke from their sleeps
+    stats = getattr(firmware, "profile_stats", {})
+    wakes = [v for k, v in stats.items() if k.startswith("wake:")]
+    if not wakes:
+        return {}
+    calls = sum(v[0] for v in wakes)
+    return {
+        "avg_wake_ms": sum(v[1] for v in wakes) / calls,
+        "max_wake_ms": max(v[2] for v in wakes),
+    }
+
+
+async def run_alongside_firmware(firmware, coro):
+    # Run a benchmark while the firmware's main() and its background tasks
+    # are running (parked on the experiment menu)
+    main = asyncio.create_task(firmware.main())
+    await asyncio.sleep(0.1)
+    if hasattr(firmware, "profile_stats"):
+        firmware.profile_stats.clear()
+    clock = sim.current().clock
+    virtual_start = clock.monotonic_ns()
+    wall_start = time.perf_counter()
+    result = await coro
+    report = {
+        "wall_seconds": time.perf_counter() - wall_start,
+        "virtual_seconds": (clock.monotonic_ns() - virtual_start) / 1e9,
+    }
+    report.update(wake_latency(firmware))
+    main.cancel()
+    return report, result
+
+
+def load(firmware_path):
+    sim.reset()
+    return sim.load_firmware(firmware_path)
+
+
+def bench_display_line(firmware_path):
+    firmware = load(firmware_path)
+    firmware.init_screen()
+    texts = [f"{n:3.0f} samples remain..." for n in range(100)]
+    index = [0]
+
+    def op():
+        index[0] = (index[0] + 1) % len(texts)
+        firmware.display_line(1, texts[index[0]])
+
+    return measure(op, 2000)
+
+
+def bench_read_buttons(firmware_path):
+    firmware = load(firmware_path)
+    return measure(firmware.read_buttons, 2000)
+
+
+def parse_status(status):
+    # How firmware before parse_frame() (VERSION_NUM 1.2) read an ATCDATA
+    # reply, inline in run_spectrophotometry()
+    return [float(s) for s in status.replace("OK", "").split(",")]
+
+
+def bench_send_cmd(firmware_path):
+    # One ATCDATA command and its reply parsed into 18 numbers, with the
+    # firmware's own parse_frame() where it has one
+    firmware = load(firmware_path)
+    if not hasattr(firmware, "send_cmd"):
+        return None
+    loop = sim.current().clock.new_event_loop()
+
+    def op():
+        status = firmware.send_cmd("ATCDATA")
+        if inspect.isawaitable(status):
+            status = loop.run_until_complete(status)
+        if hasattr(firmware, "parse_frame"):
+            data = status.encode("ASCII")
+            firmware.parse_frame(data, len(data), firmware.spectrum_frame)
+        else:
+            parse_status(status)
+
+    try:
+        return measure(op, 500)
+    finally:
+        loop.close()
+
+
+def bench_parse_frame(firmware_path):
+    firmware = load(firmware_path)
+    if not hasattr(firmware, "parse_frame"):
+        return None
+    line = sim.as7265x.format_frame([123.45 + i for i in range(18)]).encode()
+    buf = bytearray(line)
+    frame = firmware.spectrum_frame
+    return measure(lambda: firmware.parse_frame(buf, len(buf), frame), 5000)
+
+
+def bench_geiger(firmware_path, rate_hz=20.0):
+    # A full 6 x 5 s count of evenly spaced pulses, so every interval
+    # should hold exactly rate_hz * 5 counts
+    firmware = load(firmware_path)
+    if not hasattr(firmware, "count_decay_events"):
+        return None
+    sim.current().pulses["A1"] = sim.PeriodicPulses(rate_hz)
+    coro = firmware.count_decay_events(6, 5)
+    report, snapshots = sim.run(run_alongside_firmware(firmware, coro))
+    counts = firmware.interval_counts(snapshots)
+    expected = rate_hz * 5
+    report["count_error"] = max(abs(c - expected) for c in counts) / expected
+    return report
+
+
+def bench_geiger_hot(firmware_path, rate_hz=50_000.0, dead_time=100e-6):
+    # The same count against a hot Monte Carlo source with a dead-time
+    # limited tube, so the counter sees about 250,000 pulses; the average
+    # should match the non-paralyzable observed rate
+    firmware = load(firmware_path)
+    if not hasattr(firmware, "count_decay_events"):
+        return None
+    sim.current().pulses["A1"] = GeigerPulses(
+        rate_hz, background=0, dead_time=dead_time, seed=1
+    )
+    coro = firmware.count_decay_events(6, 5)
+    report, snapshots = sim.run(run_alongside_firmware(firmware, coro))
+    counts = firmware.interval_counts(snapshots)
+    expected = rate_hz / (1 + rate_hz * dead_time) * 5
+    report["count_error"] = abs(sum(counts) / len(counts) - expected) / expected
+    report["pulses"] = sum(counts)
+    return report
+
+
+def bench_ohms_law(firmware_path, num_samples=50):
+    firmware = load(firmware_path)
+    if not hasattr(firmware, "sample_current"):
+        return None
+    coro = firmware.sample_current(num_samples)
+    report, _ = sim.run(run_alongside_firmware(firmware, coro))
+    report["samples_per_sec"] = num_samples / report["virtual_seconds"]
+    return report
+
+
+BENCHMARKS = {
+    "display_line": bench_display_line,
+    "read_buttons": bench_read_buttons,
+    "send_cmd_atcdata": bench_send_cmd,
+    "parse_frame": bench_parse_frame,
+    "geiger_count": bench_geiger,
+    "geiger_count_hot": bench_geiger_hot,
+    "ohms_law_sampling": bench_ohms_law,
+}
+
+
+def git_revision(path):
+    # The commit the firmware file comes from, marked "+dirty" if it has
+    # uncommitted changes; None outside a git checkout
+    folder = Path(path).resolve().parent
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=folder,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        changes = subprocess.run(
+            ["git", "status", "--porcelain", "--", Path(path).name],
+            cwd=folder,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return revision + "+dirty" if changes else revision
+
+
+def run_benchmarks(firmware_path, names=None):
+    firmware = load(firmware_path)
+    report = {
+        "firmware": str(firmware_path),
+        "version": getattr(firmware, "VERSION_NUM", None),
+        "revision": git_revision(firmware_path),
+        "python": platform.python_version(),
+        "results": {},
+    }
+    for name, bench in BENCHMARKS.items():
+        if names and name not in names:
+            continue
+        result = bench(firmware_path)
+        report["results"][name] = result if result is not None else "skipped"
+    return report
+
+
+def compare(report, baseline, tolerance, metrics=LOWER_IS_BETTER):
+    # Return a list of metrics that got worse by more than tolerance
+    regressions = []
+    for name, result in report["results"].items():
+        old = baseline.get("results", {}).get(name)
+        if not isinstance(result, dict) or not isinstance(old, dict):
+            continue
+        for metric in metrics:
+            if metric not in result or metric not in old:
+                continue
+            new_value, old_value = result[metric], old[metric]
+            limit = old_value * (1 + tolerance)
+            # Ignore tiny absolute changes in metrics that are near zero
+            if new_value > limit and new_value - old_value > 1e-6:
+                regressions.append((name, metric, old_value, new_value))
+    return regressions
+
+
+def print_report(report):
+    print(
+        f"Firmware {report['firmware']} (VERSION_NUM {report['version']}, "
+        f"revision {report.get('revision')})"
+    )
+    for name, result in report["results"].items():
+        if not isinstance(result, dict):
+            print(f"  {name}: {result}")
+            continue
+        values = ", ".join(
+            f"{k}={v:.4g}" if isinstance(v, float) else f"{k}={v}"
+            for k, v in result.items()
+        )
+        print(f"  {name}: {values}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the lab firmware")
+    parser.add_argument("--firmware", type=Path, default=DEFAULT_FIRMWARE)
+    parser.add_argument("--output", type=Path, help="write the JSON report here")
+    parser.add_argument("--compare", type=Path, help="earlier JSON report")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="fractional slowdown allowed before a metric counts as a regression",
+    )
+    parser.add_argument("benchmarks", nargs="*", help=", ".join(BENCHMARKS))
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.firmware, args.benchmarks)
+    print_report(report)
+    if args.output:
+        with args.output.open("w") as file:
+            json.dump(report, file, indent=4)
+    if args.compare:
+        with args.compare.open("r") as file:
+            baseline = json.load(file)
+        print(
+            f"Compared with VERSION_NUM {baseline.get('version')}, "
+            f"revision {baseline.get('revision')}"
+        )
+        slower = compare(report, baseline, args.tolerance, WALL_CLOCK)
+        for name, metric, old_value, new_value in slower:
+            print(f"(slower) {name}.{metric}: {old_value:.4g} -> {new_value:.4g}")
+        regressions = compare(report, baseline, args.tolerance)
+        for name, metric, old_value, new_value in regressions:
+            print(f"REGRESSION {name}.{metric}: {old_value:.4g} -> {new_value:.4g}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
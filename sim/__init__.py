@@ -0,0 +1,9 @@
+# sim
+# Host-side stand-ins for the CircuitPython modules and sensors used by the
+# lab firmware, so each code.py can be imported and driven under CPython
+
+from sim.as7265x import TriadSensor
+from sim.clock import FirmwareExit, VirtualClock
+from sim.hardware import current, reset
+from sim.loader import install, load_firmware, run
+from sim.pulses import PeriodicPulses, PoissonPulses, PulseTimes
@@ -0,0 +1,122 @@
+# as7265x.py
+# Simulated SparkFun AS7265x triad spectral sensor speaking its AT dialect
+# See https://cdn.sparkfun.com/assets/learn_tutorials/8/3/0/AS7265x_Datasheet.pdf
+
+import random
+
+# Gain multipliers selected by ATGAIN=0 to ATGAIN=3
+GAINS = (1.0, 3.7, 16.0, 64.0)
+# Each ATINTTIME step lengthens the integration time by 2.8 ms
+INTTIME_STEP_NS = 2_800_000
+RAW_FULL_SCALE = 65535
+
+
+class TriadSensor:
+    def __init__(self, spectrum=None, counts_per_unit=2.0, noise=0.01, seed=None):
+        # Calibrated level of each of the 18 channels in the sensor's own
+        # channel order, or a function of time (seconds) returning them
+        self.spectrum = spectrum if spectrum is not None else [100.0] * 18
+        # Raw ADC counts per calibrated unit at 1x gain and one ATINTTIME step
+        self.counts_per_unit = counts_per_unit
+        self.noise = noise  # Relative standard deviation of every reading
+        self.random = random.Random(seed)
+        self.baudrate = 115200
+        self.present = True  # A missing sensor never answers
+        self.gain = 2
+        self.inttime = 35
+        self.mode = 3
+        self.leds = {}
+        self.commands = []  # Every command received, for inspection
+        self.replies = []  # (time_ns the reply is fully sent, bytes)
+        self.rx = bytearray()
+        self.burst_left = 0
+        self.burst_next_ns = 0
+
+    def frame_ns(self):
+        return max(1, self.inttime) * INTTIME_STEP_NS
+
+    def levels(self, now_ns):
+        if callable(self.spectrum):
+            return list(self.spectrum(now_ns / 1_000_000_000))
+        return list(self.spectrum)
+
+    def raw_frame(self, now_ns):
+        scale = GAINS[self.gain] * self.inttime * self.counts_per_unit
+        raw = []
+        for level in self.levels(now_ns):
+            counts = level * scale * (1 + self.random.gauss(0, self.noise))
+            raw.append(int(min(RAW_FULL_SCALE, max(0, counts))))
+        return raw
+
+    def calibrated_frame(self, now_ns):
+        scale = GAINS[self.gain] * self.inttime * self.counts_per_unit
+        return [counts / scale for counts in self.raw_frame(now_ns)]
+
+    def reply(self, now_ns, text):
+        data = (text + "\r\n").encode("ASCII")
+        # Ten bits per byte on the wire
+        ready_ns = now_ns + len(data) * 10 * 1_000_000_000 // self.baudrate
+        if self.replies:
+            ready_ns = max(ready_ns, self.replies[-1][0])
+        self.replies.append((ready_ns, data))
+
+    def receive(self, now_ns, data):
+        if not self.present:
+            return
+        self.rx += data
+        while b"\n" in self.rx:
+            line, _, rest = bytes(self.rx).partition(b"\n")
+            self.rx = bytearray(rest)
+            self.command(now_ns, line.decode("ASCII").strip().upper())
+
+    def command(self, now_ns, cmd):
+        self.commands.append(cmd)
+        name, _, arg = cmd.partition("=")
+        try:
+            value = int(arg, 0) if arg else None
+        except ValueError:
+            self.reply(now_ns, "ERROR: bad argument")
+            return
+        if name == "AT":
+            self.reply(now_ns, "OK")
+        elif name == "ATDATA":
+            self.reply(now_ns, ",".join(str(v) for v in self.raw_frame(now_ns)) + " OK")
+        elif name == "ATCDATA":
+            self.reply(now_ns, format_frame(self.calibrated_frame(now_ns)))
+        elif name == "ATGAIN" and value is not None and 0 <= value <= 3:
+            self.gain = value
+            self.reply(now_ns, "OK")
+        elif name == "ATINTTIME" and value is not None and 1 <= value <= 255:
+            self.inttime = value
+            self.reply(now_ns, "OK")
+        elif name == "ATTCSMD" and value is not None and 0 <= value <= 3:
+            self.mode = value
+            self.reply(now_ns, "OK")
+        elif name.startswith("ATLED") and value is not None:
+            self.leds[name[5:]] = value
+            self.reply(now_ns, "OK")
+        elif name == "ATBURST" and value is not None:
+            self.burst_left = value
+            self.burst_next_ns = now_ns + self.frame_ns()
+            self.reply(now_ns, "OK")
+        else:
+            self.reply(now_ns, "ERROR: unknown command")
+
+    def poll(self, now_ns):
+        # Emit any burst frames whose integration finished by now_ns
+        while self.burst_left and self.burst_next_ns <= now_ns:
+            self.reply(self.burst_next_ns, format_frame(self.calibrated_frame(now_ns)))
+            self.burst_left -= 1
+            self.burst_next_ns += self.frame_ns()
+
+    def read_ready(self, now_ns):
+        # Bytes whose transmission has completed by now_ns
+        self.poll(now_ns)
+        data = bytearray()
+        while self.replies and self.replies[0][0] <= now_ns:
+            data += self.replies.pop(0)[1]
+        return data
+
+
+def format_frame(values):
+    return ",".join(f"{v:.2f}" for v in values) + " OK"
@@ -0,0 +1,72 @@
+# clock.py
+# Virtual clock shared by every simulated device and the firmware's time module
+# Time only moves when something advances it, so runs are repeatable and a
+# 30 second Geiger count finishes in milliseconds of real time
+
+import asyncio
+import math
+
+
+class FirmwareExit(Exception):
+    # Raised inside the firmware to stop a simulated run
+    pass
+
+
+class VirtualClock:
+    def __init__(self, start_ns=0):
+        self.now_ns = start_ns
+        # Once the clock passes this time the firmware is stopped
+        self.stop_ns = None
+
+    def monotonic_ns(self):
+        return self.now_ns
+
+    def monotonic(self):
+        return self.now_ns / 1_000_000_000
+
+    def advance_ns(self, ns):
+        if ns > 0:
+            self.now_ns += int(ns)
+        if self.stop_ns is not None and self.now_ns >= self.stop_ns:
+            raise FirmwareExit(f"virtual time reached {self.now_ns} ns")
+
+    def advance(self, seconds):
+        self.advance_ns(seconds * 1_000_000_000)
+
+    def new_event_loop(self):
+        # Create an asyncio loop that runs on virtual time: whenever the loop
+        # would block waiting for a timer, the clock jumps straight to it
+        loop = asyncio.new_event_loop()
+        loop.time = self.monotonic
+        selector = loop._selector
+        select = selector.select
+
+        def virtual_select(timeout=None):
+            if timeout:
+                # Round up so the clock never stops just short of a timer
+                self.now_ns += math.ceil(timeout * 1_000_000_000)
+            return select(0)
+
+        selector.select = virtual_select
+        return loop
+
+    def run(self, coro, seconds=None):
+        # Run a coroutine on virtual time, stopping it after seconds if given
+        # Returns the coroutine's result, or None if it was stopped
+        loop = self.new_event_loop()
+        try:
+            if seconds is None:
+                return loop.run_until_complete(coro)
+            try:
+                return loop.run_until_complete(asyncio.wait_for(coro, seconds))
+            except asyncio.TimeoutError:
+                return None
+        finally:
+            # Stop the firmware's background tasks too
+            # (gather() with no tasks would make its future on another loop)
+            tasks = asyncio.all_tasks(loop)
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            loop.close()
@@ -0,0 +1,234 @@
+# geiger.py
+# Monte Carlo Geiger counter: Poisson decays from the Lab 12 sources plus
+# background, thinned by the tube's dead time, generated with NumPy in bulk
+# (unlike the rest of sim, this module needs NumPy and the analysis package)
+#
+#   tube = GeigerTube(mantle_rate(16), dead_time=100e-6, seed=1)
+#   times = tube.record(30)                     # recorded pulse times (s)
+#   dist, counts = mantle_readings(7, seed=1)   # like a student's mantle.txt
+#   hw.pulses["A1"] = GeigerPulses(5000)        # drive countio and rp2pio
+#
+# Write synthetic data files the plot scripts can read:
+#   python -m sim.geiger mantle "Sim - mantle.txt" --seed 1
+#   python -m sim.geiger rods "Sim - rods.txt" --strength 20 --dead-time 200e-6
+#   python -m sim.geiger arrivals "Sim - arrivals.txt" --rate 300 --seconds 20
+
+import argparse
+import math
+
+import numpy as np
+
+from analysis.deadtime import (
+    COUNT_INTERVALS,
+    COUNT_SECONDS,
+    DEAD_TIME,
+    MODELS,
+    check_model,
+)
+from analysis.experiments import mantle_distances, rod_numbers
+from sim.pulses import PulseTrain
+
+# Rates in counts per second, roughly matching the labs' sample data
+BACKGROUND_RATE = 0.4
+# Over the few cm of the mantle experiment its rate falls off close to
+# exponentially with distance (fitted to mantle.txt)
+MANTLE_RATE = 72.0
+MANTLE_ATTENUATION = 0.049  # per mm
+# Each welding rod adds the same rate
+ROD_RATE = 5.0
+
+
+def mantle_rate(distance_mm, strength=1.0):
+    distance_mm = np.asarray(distance_mm, dtype=np.float64)
+    return strength * MANTLE_RATE * np.exp(-MANTLE_ATTENUATION * distance_mm)
+
+
+def rod_rate(rods, strength=1.0):
+    return strength * ROD_RATE * np.asarray(rods, dtype=np.float64)
+
+
+class GeigerTube:
+    # An endless stream of recorded pulse times for a source of rate_hz,
+    # handed out in consecutive stretches by record()
+    #   non-paralyzable: the tube ignores decays for dead_time after each
+    #     pulse it records; with a Poisson source the gaps between recorded
+    #     pulses are then exactly dead_time plus an exponential, so they are
+    #     drawn directly
+    #   paralyzable: every decay restarts the dead time, so a decay is
+    #     recorded only if the one before it was at least dead_time earlier
+    def __init__(
+        self,
+        rate_hz,
+        background=BACKGROUND_RATE,
+        dead_time=DEAD_TIME,
+        model="nonparalyzable",
+        seed=None,
+    ):
+        check_model(model)
+        self.rate_hz = rate_hz + background
+        self.dead_time = dead_time
+        self.model = model
+        self.rng = np.random.default_rng(seed)
+        self.time = 0.0  # End of the stretch recorded so far
+        self.last_true = -np.inf  # Last decay, recorded or not
+        self.last_kept = -np.inf  # Last recorded pulse
+
+    def _events(self, start, end, dead_time):
+        # Event times in [start, end) from the running sum of gaps, each an
+        # exponential plus dead_time (the first has no dead time: start is
+        # already past any dead time)
+        chunks = []
+        while True:
+            expected = (end - start) / (1 / self.rate_hz + dead_time)
+            size = int(expected + 6 * math.sqrt(expected) + 16)
+            gaps = self.rng.exponential(1 / self.rate_hz, size)
+            gaps[1:] += dead_time
+            times = start + np.cumsum(gaps)
+            if times[-1] >= end:
+                chunks.append(times[: np.searchsorted(times, end)])
+                return np.concatenate(chunks)
+            chunks.append(times)
+            start = times[-1] + dead_time
+
+    def decays(self, duration):
+        # True decay times over the next duration seconds (the source has
+        # no memory, so each stretch starts fresh from its beginning)
+        if self.rate_hz <= 0:
+            return np.empty(0)
+        return self._events(self.time, self.time + duration, 0.0)
+
+    def record(self, duration):
+        end = self.time + duration
+        if self.rate_hz <= 0:
+            recorded = np.empty(0)
+        elif self.model == "nonparalyzable":
+            start = max(self.time, self.last_kept + self.dead_time)
+            recorded = self._events(start, end, self.dead_time)
+        else:
+            true = self.decays(duration)
+            previous = np.concatenate(([self.last_true], true[:-1]))
+            recorded = true[true - previous >= self.dead_time]
+            if len(true):
+                self.last_true = true[-1]
+        self.time = end
+        if len(recorded):
+            self.last_kept = recorded[-1]
+        return recorded
+
+
+def reading(
+    rate_hz,
+    rng,
+    background=BACKGROUND_RATE,
+    dead_time=DEAD_TIME,
+    model="nonparalyzable",
+):
+    # One reading as the firmware shows it: the average count over six
+    # 5 second intervals, rounded
+    tube = GeigerTube(rate_hz, background, dead_time, model, seed=rng)
+    times = tube.record(COUNT_SECONDS * COUNT_INTERVALS)
+    edges = np.arange(COUNT_INTERVALS + 1) * COUNT_SECONDS
+    counts = np.diff(np.searchsorted(times, edges))
+    return round(counts.mean())
+
+
+def readings(rates, seed=None, **options):
+    rng = np.random.default_rng(seed)
+    return np.array([reading(rate, rng, **options) for rate in rates])
+
+
+def mantle_readings(num_readings=7, strength=1.0, seed=None, **options):
+    # (distances, counts) in the order of a student's mantle.txt
+    dist = mantle_distances(num_readings)
+    return dist, readings(mantle_rate(dist, strength), seed, **options)
+
+
+def rod_readings(num_readings=7, strength=1.0, seed=None, **options):
+    # (rods, counts) in the order of a student's rods.txt
+    rods = rod_numbers(num_readings)
+    return rods, readings(rod_rate(rods, strength), seed, **options)
+
+
+class GeigerPulses(PulseTrain):
+    # A GeigerTube as a sim pulse train, for countio.Counter and the PIO
+    # arrival-time capture; pulses are generated a stretch at a time and
+    # looked up by binary search, so high rates stay cheap to count
+    def __init__(
+        self,
+        rate_hz,
+        background=BACKGROUND_RATE,
+        dead_time=DEAD_TIME,
+        model="nonparalyzable",
+        seed=None,
+        stretch=1.0,
+    ):
+        super().__init__()
+        self.tube = GeigerTube(rate_hz, background, dead_time, model, seed)
+        self.stretch = stretch
+        self.edges_ns = np.empty(0, dtype=np.int64)
+        self.offset = 0  # Edges before edges_ns[0]
+
+    def _extend(self, t_ns):
+        # Generate stretches until they cover t_ns, dropping counted edges
+        while self.tube.time * 1_000_000_000 <= t_ns:
+            times = self.tube.record(self.stretch)
+            done = self.count - self.offset
+            self.offset = self.count
+            self.edges_ns = np.concatenate(
+                (self.edges_ns[done:], (times * 1_000_000_000).astype(np.int64))
+            )
+
+    def count_at(self, t_ns):
+        self._extend(t_ns)
+        self.count = max(
+            self.count, self.offset + int(np.searchsorted(self.edges_ns, t_ns, "right"))
+        )
+        return self.count
+
+    def edges_until(self, t_ns):
+        start = self.count
+        self.count_at(t_ns)
+        return self.edges_ns[start - self.offset : self.count - self.offset].tolist()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write synthetic Geiger data")
+    parser.add_argument("experiment", choices=["mantle", "rods", "arrivals"])
+    parser.add_argument("output", help="data file to write")
+    parser.add_argument("--readings", type=int, default=7)
+    parser.add_argument(
+        "--strength", type=float, default=1.0, help="source activity multiplier"
+    )
+    parser.add_argument(
+        "--rate", type=float, default=300.0, help="source rate for arrivals (/s)"
+    )
+    parser.add_argument("--seconds", type=float, default=20.0, help="arrivals length")
+    parser.add_argument("--background", type=float, default=BACKGROUND_RATE)
+    parser.add_argument("--dead-time", type=float, default=DEAD_TIME)
+    parser.add_argument("--model", choices=MODELS, default=MODELS[0])
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    options = {
+        "background": args.background,
+        "dead_time": args.dead_time,
+        "model": args.model,
+    }
+    if args.experiment == "arrivals":
+        tube = GeigerTube(args.rate, seed=args.seed, **options)
+        times = tube.record(args.seconds)
+        # Seconds since the first pulse, to the microsecond, as
+        # capture_arrivals.py saves them
+        np.savetxt(args.output, np.round(times - times[0], 6), fmt="%.6f")
+        print(f"Wrote {len(times):,} pulse times to {args.output}")
+        return
+    make = mantle_readings if args.experiment == "mantle" else rod_readings
+    x, counts = make(args.readings, args.strength, args.seed, **options)
+    np.savetxt(args.output, counts, fmt="%d")
+    for position, count in zip(x, counts):
+        print(f"{position:4d}: {count}")
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
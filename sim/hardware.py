@@ -0,0 +1,235 @@
+# hardware.py
+# State of the simulated board: the virtual clock plus every device the
+# fake CircuitPython modules talk to. Tests and benchmarks script the
+# devices through current() and start over with reset().
+
+import math
+import random
+
+from sim.as7265x import TriadSensor
+from sim.clock import VirtualClock
+
+
+def read_value(source, now_s):
+    # A scripted value is a constant, a function of time (seconds),
+    # or an iterator that is advanced on every read
+    if callable(source):
+        return source(now_s)
+    if hasattr(source, "__next__"):
+        return next(source)
+    return source
+
+
+class Joystick:
+    # Joy FeatherWing buttons; a pressed button pulls its pin low
+    def __init__(self):
+        self.pressed = set()
+
+    def press(self, pin):
+        self.pressed.add(pin)
+
+    def release(self, pin):
+        self.pressed.discard(pin)
+
+    def read_bulk(self, mask):
+        bits = mask
+        for pin in self.pressed:
+            bits &= ~(1 << pin)
+        return bits
+
+
+class PowerSensor:
+    # INA219 measuring the current from a supply through the shunt and a load
+    def __init__(self, supply_volts=3.3, load_ohms=100.0, shunt_ohms=0.1):
+        self.supply_volts = supply_volts
+        self.load_ohms = load_ohms  # Scripted value
+        self.shunt_ohms = shunt_ohms
+        self.noise_amps = 20e-6  # Per conversion without on-chip averaging
+        self.random = random.Random(0)
+
+    def current_amps(self, now_s, averaging=1):
+        load = read_value(self.load_ohms, now_s)
+        if load is None:  # Open circuit
+            return 0.0
+        amps = self.supply_volts / (load + self.shunt_ohms)
+        return amps + self.random.gauss(0, self.noise_amps / math.sqrt(averaging))
+
+    def bus_volts(self, now_s, averaging=1):
+        load = read_value(self.load_ohms, now_s)
+        if load is None:
+            return self.supply_volts
+        return self.current_amps(now_s, averaging) * load
+
+
+# MLX90393 sensitivity in uT per LSB at RESOLUTION_16 with HALLCONF 0xC,
+# as (x and y, z) for each gain setting (datasheet table 17)
+MLX_LSB_UT = (
+    (0.751, 1.210),
+    (0.601, 0.968),
+    (0.451, 0.726),
+    (0.376, 0.605),
+    (0.300, 0.484),
+    (0.250, 0.403),
+    (0.200, 0.323),
+    (0.150, 0.242),
+)
+
+
+class Magnetometer:
+    # MLX90393 in a field of field_ut = (x, y, z) microtesla (scripted value)
+    # Answers the single-measurement, burst and read commands on the I2C bus
+    def __init__(self, field_ut=(0.0, 0.0, 50.0)):
+        self.field_ut = field_ut
+        self.noise_ut = 1.0  # Per axis without oversampling or filtering
+        self.random = random.Random(0)
+        self.gain = 7
+        self.resolution = [0, 0, 0]
+        self.filter = 7
+        self.oversampling = 3
+        self.burst = False
+        self.burst_start_ns = 0
+        self.converted = 0  # Conversions already read out in burst mode
+        self.stale_reads = 0  # Burst reads made before a new conversion
+        self.commands = []  # Every command byte received, for inspection
+
+    def conversion_ns(self, axes=3):
+        # Conversion time from the datasheet: 67 + 64 * 2^OSR * (2 + 2^FILT) us
+        # per axis
+        per_axis = 67_000 + 64_000 * (1 << self.oversampling) * (2 + (1 << self.filter))
+        return per_axis * axes
+
+    def averaging(self):
+        return (1 << self.oversampling) * (2 + (1 << self.filter)) / 3
+
+    def read(self, now_s, averaging=None):
+        if averaging is None:
+            averaging = self.averaging()
+        noise = self.noise_ut / math.sqrt(averaging)
+        x, y, z = read_value(self.field_ut, now_s)
+        return tuple(v + self.random.gauss(0, noise) for v in (x, y, z))
+
+    def raw(self, now_s):
+        # One X, Y, Z measurement as the chip sends it: big-endian 16-bit
+        # words, offset for the 18 and 19 bit resolutions
+        data = bytearray()
+        for axis, value in enumerate(self.read(now_s)):
+            res = self.resolution[axis]
+            lsb = MLX_LSB_UT[self.gain][1 if axis == 2 else 0] * (1 << res)
+            counts = round(value / lsb)
+            if res < 2:
+                counts = min(32767, max(-32768, counts)) & 0xFFFF
+            else:
+                offset = 32768 if res == 2 else 16384
+                counts = min(65535, max(0, counts + offset))
+            data += counts.to_bytes(2, "big")
+        return data
+
+    def transfer(self, now_ns, command):
+        # Handle one command; returns the status byte and any data
+        self.commands.append(command)
+        kind = command & 0xF0
+        status = 0x80 if self.burst else 0
+        if kind == 0x10:  # SB: start burst mode
+            self.burst = True
+            self.burst_start_ns = now_ns
+            self.converted = 0
+            return bytes([0x80])
+        if kind == 0x80:  # EX: exit mode
+            self.burst = False
+            return bytes([0])
+        if kind == 0x40:  # RM: read measurement
+            if self.burst:
+                done = (now_ns - self.burst_start_ns) // self.conversion_ns()
+                if done <= self.converted:
+                    self.stale_reads += 1
+                self.converted = done
+            return bytes([status | 0x02]) + self.raw(now_ns / 1_000_000_000)
+        return bytes([status])
+
+
+class Battery:
+    def __init__(self, cell_percent=87.5, cell_voltage=3.95):
+        self.cell_percent = cell_percent
+        self.cell_voltage = cell_voltage
+
+
+class SerialPort:
+    # usb_cdc port: the host side feeds input and collects output
+    def __init__(self, clock):
+        self.clock = clock
+        self.input = bytearray()
+        self.output = bytearray()
+        self.timeout = 1.0
+        self.connected = True
+
+    def feed(self, data):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self.input += data
+
+    def take_output(self):
+        data = bytes(self.output)
+        self.output.clear()
+        return data
+
+
+class Hardware:
+    def __init__(self):
+        self.clock = VirtualClock()
+        # Virtual time every simulated bus transaction takes
+        self.io_delay_ns = 100_000
+        # I2C addresses that answer a bus scan (OLED, Joy Wing, INA219, MAX17048)
+        self.i2c_addresses = [0x36, 0x3C, 0x40, 0x49]
+        # Devices that answer raw transfers through adafruit_bus_device,
+        # keyed by I2C address
+        self.i2c_targets = {}
+        self.joystick = Joystick()
+        self.ina219 = PowerSensor()
+        self.mlx90393 = Magnetometer()
+        self.battery = Battery()
+        self.triad = TriadSensor(seed=0)
+        # Pulse trains (see sim.pulses) keyed by board pin name, e.g. "A1"
+        self.pulses = {}
+        # Scripted input levels keyed by board pin name
+        self.pin_inputs = {}
+        self.usb_data = SerialPort(self.clock)
+        self.usb_console = SerialPort(self.clock)
+        self.displays = []
+        self.neopixels = []
+
+    def checkpoint(self, ns=None):
+        # Account for the time a bus transaction takes
+        self.clock.advance_ns(self.io_delay_ns if ns is None else ns)
+
+    def now_s(self):
+        return self.clock.monotonic()
+
+    def display_text(self, index=0):
+        # Text of every label on a display, top to bottom
+        display = self.displays[index]
+        labels = [g for g in flatten(display.root_group) if hasattr(g, "text")]
+        labels.sort(key=lambda g: g.y)
+        return [g.text for g in labels]
+
+
+def flatten(group):
+    if group is None:
+        return
+    for item in group:
+        if hasattr(item, "__iter__") and not hasattr(item, "text"):
+            yield from flatten(item)
+        else:
+            yield item
+
+
+_state = Hardware()
+
+
+def current():
+    return _state
+
+
+def reset():
+    global _state
+    _state = Hardware()
+    return _state
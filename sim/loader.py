@@ -0,0 +1,121 @@
+# loader.py
+# Load a lab's code.py against the simulated hardware
+#
+#   import sim
+#   firmware = sim.load_firmware("Lab 12 - Geiger Counter/code.py")
+#   sim.current().pulses["A1"] = sim.PoissonPulses(rate_hz=20)
+#   sim.run(firmware.main(), seconds=60)
+
+import asyncio
+import collections
+import gc
+import sys
+import time
+import tracemalloc
+import types
+from pathlib import Path
+
+from sim import hardware
+from sim.clock import FirmwareExit
+
+MODULES_DIR = Path(__file__).parent / "modules"
+
+Implementation = collections.namedtuple(
+    "Implementation", ["name", "version", "machine", "mpy"]
+)
+
+
+def install():
+    # Make the fake CircuitPython modules importable
+    if str(MODULES_DIR) not in sys.path:
+        sys.path.insert(0, str(MODULES_DIR))
+
+
+def make_time_module():
+    # time module whose clock is the simulated one
+    clock = hardware.current().clock
+    module = types.ModuleType("time")
+    module.monotonic = clock.monotonic
+    module.monotonic_ns = clock.monotonic_ns
+    module.sleep = clock.advance
+    module.time = lambda: int(clock.monotonic())
+    module.localtime = time.localtime
+    module.mktime = time.mktime
+    module.struct_time = time.struct_time
+    return module
+
+
+def make_sys_module():
+    # sys module that reports itself as CircuitPython
+    module = types.ModuleType("sys")
+    module.__dict__.update(sys.__dict__)
+    module.implementation = Implementation("circuitpython", (9, 2, 1), "sim", 517)
+    module.platform = "RP2040"
+    return module
+
+
+def make_gc_module(heap_size=192 * 1024):
+    # gc module with CircuitPython's mem_free() and mem_alloc(); the heap
+    # in use is whatever tracemalloc is tracing (none if it isn't running)
+    module = types.ModuleType("gc")
+    module.__dict__.update(gc.__dict__)
+
+    def mem_alloc():
+        if not tracemalloc.is_tracing():
+            return 0
+        return tracemalloc.get_traced_memory()[0]
+
+    module.mem_alloc = mem_alloc
+    module.mem_free = lambda: max(0, heap_size - mem_alloc())
+    return module
+
+
+def make_asyncio_module(started):
+    # asyncio whose run() only records the coroutine, so loading firmware
+    # returns once its setup is done instead of running the event loop
+    module = types.ModuleType("asyncio")
+    module.__dict__.update(asyncio.__dict__)
+
+    def run(coro):
+        started.append(coro.__name__)
+        coro.close()
+
+    module.run = run
+    return module
+
+
+def load_firmware(path, seconds=None):
+    # Execute a code.py file and return it as a module
+    # Firmware with a top-level loop is stopped once it blocks on USB input
+    # with nothing left to read, or after seconds of virtual time
+    install()
+    path = Path(path)
+    clock = hardware.current().clock
+    module = types.ModuleType("code")
+    module.__file__ = str(path)
+    module.started = []  # Coroutines passed to asyncio.run()
+    overrides = {
+        "time": make_time_module(),
+        "sys": make_sys_module(),
+        "gc": make_gc_module(),
+        "asyncio": make_asyncio_module(module.started),
+    }
+    saved = {name: sys.modules.get(name) for name in overrides}
+    sys.modules.update(overrides)
+    clock.stop_ns = None if seconds is None else clock.now_ns + int(seconds * 1e9)
+    try:
+        exec(compile(path.read_text(), str(path), "exec"), module.__dict__)
+    except FirmwareExit:
+        pass
+    finally:
+        clock.stop_ns = None
+        for name, saved_module in saved.items():
+            sys.modules[name] = saved_module
+    # Later calls (e.g. firmware.main()) use the real event loop machinery
+    module.asyncio = asyncio
+    return module
+
+
+def run(coro, seconds=None):
+    # Run a firmware coroutine on the virtual clock for up to seconds
+    return hardware.current().clock.run(coro, seconds)
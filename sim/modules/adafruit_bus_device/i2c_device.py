@@ -0,0 +1,47 @@
+# i2c_device.py
+# Simulated I2CDevice passing raw transfers to hardware.current().i2c_targets
+# A write hands the command to the target; the following read returns its
+# reply (status byte first, as the MLX90393 sends it)
+
+from sim import hardware
+
+
+class I2CDevice:
+    def __init__(self, i2c, device_address, probe=True):
+        self.hardware = hardware.current()
+        self.i2c = i2c
+        self.device_address = device_address
+        self.reply = b""
+        if probe and device_address not in self.hardware.i2c_targets:
+            raise ValueError(f"No I2C device at address: 0x{device_address:x}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def write(self, buf, *, start=0, end=None):
+        self.hardware.checkpoint()
+        target = self.hardware.i2c_targets[self.device_address]
+        data = bytes(buf[start:end])
+        self.reply = target.transfer(self.hardware.clock.monotonic_ns(), data[0])
+
+    def readinto(self, buf, *, start=0, end=None):
+        self.hardware.checkpoint()
+        end = len(buf) if end is None else end
+        data = self.reply[: end - start].ljust(end - start, b"\x00")
+        buf[start:end] = data
+
+    def write_then_readinto(
+        self,
+        out_buffer,
+        in_buffer,
+        *,
+        out_start=0,
+        out_end=None,
+        in_start=0,
+        in_end=None,
+    ):
+        self.write(out_buffer, start=out_start, end=out_end)
+        self.readinto(in_buffer, start=in_start, end=in_end)
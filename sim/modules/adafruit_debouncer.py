@@ -0,0 +1,41 @@
+# adafruit_debouncer.py
+# Debouncer with the same behavior as the Adafruit library, timed by the
+# simulated clock
+
+from sim import hardware
+
+
+class Debouncer:
+    def __init__(self, io_or_predicate, interval=0.010):
+        self.hardware = hardware.current()
+        if callable(io_or_predicate):
+            self.function = io_or_predicate
+        else:
+            self.function = lambda: io_or_predicate.value
+        self.interval = interval
+        self.state = bool(self.function())
+        self.unstable = self.state
+        self.previous = self.state
+        self.changed_s = self.hardware.now_s()
+
+    def update(self):
+        now_s = self.hardware.now_s()
+        self.previous = self.state
+        current = bool(self.function())
+        if current != self.unstable:
+            self.changed_s = now_s
+            self.unstable = current
+        elif now_s - self.changed_s >= self.interval:
+            self.state = current
+
+    @property
+    def value(self):
+        return self.state
+
+    @property
+    def rose(self):
+        return self.state and not self.previous
+
+    @property
+    def fell(self):
+        return not self.state and self.previous
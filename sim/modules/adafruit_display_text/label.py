@@ -0,0 +1,26 @@
+# label.py
+# Simulated text label
+
+from sim import hardware
+
+
+class Label:
+    def __init__(self, font, *, text="", color=0xFFFFFF, x=0, y=0, **kwargs):
+        self.hardware = hardware.current()
+        self.font = font
+        self._text = text
+        self.color = color
+        self.x = x
+        self.y = y
+        self.updates = 0  # Times the text was laid out again
+
+    @property
+    def text(self):
+        return self._text
+
+    @text.setter
+    def text(self, value):
+        # Laying out the glyphs costs time on the microcontroller
+        self.hardware.checkpoint(50_000 + 5_000 * len(value))
+        self._text = value
+        self.updates += 1
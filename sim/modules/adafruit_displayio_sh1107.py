@@ -0,0 +1,9 @@
+# adafruit_displayio_sh1107.py
+# Simulated SH1107 OLED driver
+
+import displayio
+
+
+class SH1107(displayio.Display):
+    def __init__(self, bus, *, width=128, height=64, **kwargs):
+        super().__init__(bus, width=width, height=height, **kwargs)
@@ -0,0 +1,116 @@
+# adafruit_ina219.py
+# Simulated INA219 current sensor measuring hardware.current().ina219
+
+from sim import hardware
+
+
+class ADCResolution:
+    ADCRES_9BIT_1S = 0x00
+    ADCRES_10BIT_1S = 0x01
+    ADCRES_11BIT_1S = 0x02
+    ADCRES_12BIT_1S = 0x03
+    ADCRES_12BIT_2S = 0x09
+    ADCRES_12BIT_4S = 0x0A
+    ADCRES_12BIT_8S = 0x0B
+    ADCRES_12BIT_16S = 0x0C
+    ADCRES_12BIT_32S = 0x0D
+    ADCRES_12BIT_64S = 0x0E
+    ADCRES_12BIT_128S = 0x0F
+
+
+class BusVoltageRange:
+    RANGE_16V = 0x00
+    RANGE_32V = 0x01
+
+
+class Gain:
+    DIV_1_40MV = 0x00
+    DIV_2_80MV = 0x01
+    DIV_4_160MV = 0x02
+    DIV_8_320MV = 0x03
+
+
+class Mode:
+    POWERDOWN = 0x00
+    SVOLT_TRIGGERED = 0x01
+    BVOLT_TRIGGERED = 0x02
+    SANDBVOLT_TRIGGERED = 0x03
+    ADCOFF = 0x04
+    SVOLT_CONTINUOUS = 0x05
+    BVOLT_CONTINUOUS = 0x06
+    SANDBVOLT_CONTINUOUS = 0x07
+
+
+def conversion_ns(resolution):
+    # Conversion time of one reading (from the INA219 datasheet)
+    if resolution <= ADCResolution.ADCRES_12BIT_1S:
+        return (84_000, 148_000, 276_000, 532_000)[resolution & 0x03]
+    return 532_000 * averaging(resolution)
+
+
+def averaging(resolution):
+    if resolution <= ADCResolution.ADCRES_12BIT_1S:
+        return 1
+    return 1 << (resolution - 0x08)
+
+
+class INA219:
+    def __init__(self, i2c_bus, addr=0x40):
+        self.hardware = hardware.current()
+        self.model = self.hardware.ina219
+        self.addr = addr
+        self.bus_adc_resolution = ADCResolution.ADCRES_12BIT_1S
+        self.shunt_adc_resolution = ADCResolution.ADCRES_12BIT_1S
+        self.bus_voltage_range = BusVoltageRange.RANGE_32V
+        self.gain = Gain.DIV_8_320MV
+        self.mode = Mode.SANDBVOLT_CONTINUOUS
+        self.reads = 0  # Register reads
+
+    def set_calibration_32V_2A(self):
+        self.bus_voltage_range = BusVoltageRange.RANGE_32V
+
+    def set_calibration_32V_1A(self):
+        self.bus_voltage_range = BusVoltageRange.RANGE_32V
+
+    def set_calibration_16V_400mA(self):
+        self.bus_voltage_range = BusVoltageRange.RANGE_16V
+        self.gain = Gain.DIV_1_40MV
+
+    def _read(self):
+        self.hardware.checkpoint()
+        self.reads += 1
+        return self.hardware.now_s()
+
+    @property
+    def conversion_ready(self):
+        now_ns = self.hardware.clock.monotonic_ns()
+        self._read()
+        cycle = conversion_ns(self.bus_adc_resolution)
+        cycle += conversion_ns(self.shunt_adc_resolution)
+        return now_ns % cycle < self.hardware.io_delay_ns
+
+    @property
+    def current(self):
+        # Milliamps
+        n = averaging(self.shunt_adc_resolution)
+        return self.model.current_amps(self._read(), n) * 1000
+
+    @property
+    def shunt_voltage(self):
+        n = averaging(self.shunt_adc_resolution)
+        return self.model.current_amps(self._read(), n) * self.model.shunt_ohms
+
+    @property
+    def bus_voltage(self):
+        n = averaging(self.bus_adc_resolution)
+        return self.model.bus_volts(self._read(), n)
+
+    @property
+    def power(self):
+        # Milliwatts
+        now_s = self._read()
+        return self.model.bus_volts(now_s) * self.model.current_amps(now_s) * 1000
+
+    @property
+    def overflow(self):
+        return False
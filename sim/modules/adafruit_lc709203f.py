@@ -0,0 +1,29 @@
+# adafruit_lc709203f.py
+# Simulated LC709203F battery fuel gauge
+
+from sim import hardware
+
+
+class PackSize:
+    MAH100 = 0x08
+    MAH200 = 0x0B
+    MAH400 = 0x0E
+    MAH500 = 0x10
+    MAH1000 = 0x19
+    MAH2000 = 0x2D
+    MAH2200 = 0x30
+    MAH3000 = 0x36
+
+
+class LC709203F:
+    def __init__(self, i2c_bus, address=0x0B):
+        self.battery = hardware.current().battery
+        self.pack_size = PackSize.MAH500
+
+    @property
+    def cell_percent(self):
+        return self.battery.cell_percent
+
+    @property
+    def cell_voltage(self):
+        return self.battery.cell_voltage
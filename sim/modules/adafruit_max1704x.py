@@ -0,0 +1,17 @@
+# adafruit_max1704x.py
+# Simulated MAX17048 battery fuel gauge
+
+from sim import hardware
+
+
+class MAX17048:
+    def __init__(self, i2c_bus, address=0x36):
+        self.battery = hardware.current().battery
+
+    @property
+    def cell_percent(self):
+        return self.battery.cell_percent
+
+    @property
+    def cell_voltage(self):
+        return self.battery.cell_voltage
@@ -0,0 +1,24 @@
+# adafruit_mcp4725.py
+# Simulated MCP4725 12-bit DAC
+
+
+class MCP4725:
+    def __init__(self, i2c, *, address=0x62):
+        self.address = address
+        self.raw_value = 0
+
+    @property
+    def value(self):
+        return self.raw_value << 4
+
+    @value.setter
+    def value(self, value):
+        self.raw_value = value >> 4
+
+    @property
+    def normalized_value(self):
+        return self.raw_value / 4095
+
+    @normalized_value.setter
+    def normalized_value(self, value):
+        self.raw_value = int(round(value * 4095))
@@ -0,0 +1,120 @@
+# adafruit_mlx90393.py
+# Simulated MLX90393 magnetometer measuring hardware.current().mlx90393
+
+from sim import hardware
+
+GAIN_5X = 0x0
+GAIN_4X = 0x1
+GAIN_3X = 0x2
+GAIN_2_5X = 0x3
+GAIN_2X = 0x4
+GAIN_1_67X = 0x5
+GAIN_1_33X = 0x6
+GAIN_1X = 0x7
+
+RESOLUTION_16 = 0x0
+RESOLUTION_17 = 0x1
+RESOLUTION_18 = 0x2
+RESOLUTION_19 = 0x3
+
+FILTER_0 = 0x0
+FILTER_1 = 0x1
+FILTER_2 = 0x2
+FILTER_3 = 0x3
+FILTER_4 = 0x4
+FILTER_5 = 0x5
+FILTER_6 = 0x6
+FILTER_7 = 0x7
+
+OSR_0 = 0x0
+OSR_1 = 0x1
+OSR_2 = 0x2
+OSR_3 = 0x3
+
+
+class MLX90393:
+    # Settings live on the model so raw transfers made through
+    # adafruit_bus_device see the same configuration
+    def __init__(
+        self,
+        i2c_bus,
+        address=0x0C,
+        *,
+        gain=GAIN_2_5X,
+        resolution=RESOLUTION_16,
+        filt=FILTER_7,
+        oversampling=OSR_3,
+        debug=False,
+    ):
+        self.hardware = hardware.current()
+        self.model = self.hardware.mlx90393
+        self.hardware.i2c_targets[address] = self.model
+        self.address = address
+        self.gain = gain
+        self.resolution_x = resolution
+        self.resolution_y = resolution
+        self.resolution_z = resolution
+        self.filter = filt
+        self.oversampling = oversampling
+        self.reads = 0
+
+    @property
+    def gain(self):
+        return self.model.gain
+
+    @gain.setter
+    def gain(self, value):
+        self.hardware.checkpoint()
+        self.model.gain = value
+
+    @property
+    def filter(self):
+        return self.model.filter
+
+    @filter.setter
+    def filter(self, value):
+        self.hardware.checkpoint()
+        self.model.filter = value
+
+    @property
+    def oversampling(self):
+        return self.model.oversampling
+
+    @oversampling.setter
+    def oversampling(self, value):
+        self.hardware.checkpoint()
+        self.model.oversampling = value
+
+    def set_resolution(self, axis, resolution):
+        self.hardware.checkpoint()
+        self.model.resolution[axis] = resolution
+
+    resolution_x = property(
+        lambda self: self.model.resolution[0],
+        lambda self, value: self.set_resolution(0, value),
+    )
+    resolution_y = property(
+        lambda self: self.model.resolution[1],
+        lambda self, value: self.set_resolution(1, value),
+    )
+    resolution_z = property(
+        lambda self: self.model.resolution[2],
+        lambda self, value: self.set_resolution(2, value),
+    )
+
+    @property
+    def magnetic(self):
+        # Single measurement mode: start, wait for the conversion, read back
+        self.hardware.checkpoint()
+        self.hardware.checkpoint(self.model.conversion_ns())
+        self.hardware.checkpoint()
+        self.reads += 1
+        return self.model.read(self.hardware.now_s())
+
+    @property
+    def temperature(self):
+        self.hardware.checkpoint()
+        return 25.0
+
+    def reset(self):
+        self.hardware.checkpoint()
@@ -0,0 +1,25 @@
+# seesaw.py
+# Simulated Seesaw with a Joy FeatherWing attached
+
+from sim import hardware
+
+
+class Seesaw:
+    INPUT = 0x00
+    OUTPUT = 0x01
+    INPUT_PULLUP = 0x02
+    INPUT_PULLDOWN = 0x03
+
+    def __init__(self, i2c_bus, addr=0x49, drdy=None, reset=True):
+        self.hardware = hardware.current()
+        self.addr = addr
+        self.reads = 0  # I2C transactions issued by digital_read_bulk
+
+    def pin_mode_bulk(self, pins, mode):
+        self.hardware.checkpoint()
+
+    def digital_read_bulk(self, pins, delay=0.008):
+        # The real library waits delay seconds for the reply
+        self.hardware.checkpoint(int(delay * 1_000_000_000))
+        self.reads += 1
+        return self.hardware.joystick.read_bulk(pins)
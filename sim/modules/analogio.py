@@ -0,0 +1,29 @@
+# analogio.py
+# Simulated ADC and DAC pins
+
+from sim import hardware
+
+
+class AnalogIn:
+    def __init__(self, pin):
+        self.hardware = hardware.current()
+        self.pin = pin
+        self.reference_voltage = 3.3
+
+    @property
+    def value(self):
+        self.hardware.checkpoint(10_000)
+        source = self.hardware.pin_inputs.get(self.pin.name, 0)
+        return int(hardware.read_value(source, self.hardware.now_s()))
+
+    def deinit(self):
+        pass
+
+
+class AnalogOut:
+    def __init__(self, pin):
+        self.pin = pin
+        self.value = 0
+
+    def deinit(self):
+        pass
@@ -0,0 +1,31 @@
+# board.py
+# Simulated board pins; any upper-case pin name (A1, TX, GP15, ...) exists
+
+
+class Pin:
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return f"board.{self.name}"
+
+
+_pins = {}
+
+
+def __getattr__(name):
+    if not name[:1].isupper():
+        raise AttributeError(name)
+    if name not in _pins:
+        _pins[name] = Pin(name)
+    return _pins[name]
+
+
+def I2C():
+    import busio
+
+    return busio.I2C(__getattr__("SCL"), __getattr__("SDA"))
+
+
+def STEMMA_I2C():
+    return I2C()
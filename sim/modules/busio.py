@@ -0,0 +1,116 @@
+# busio.py
+# Simulated I2C bus and a UART wired to the AS7265x triad sensor
+
+from sim import hardware
+
+
+class I2C:
+    def __init__(self, scl=None, sda=None, frequency=100000):
+        self.hardware = hardware.current()
+        self.locked = False
+
+    def try_lock(self):
+        if self.locked:
+            return False
+        self.locked = True
+        return True
+
+    def unlock(self):
+        self.locked = False
+
+    def scan(self):
+        self.hardware.checkpoint()
+        return list(self.hardware.i2c_addresses)
+
+    def deinit(self):
+        pass
+
+
+class UART:
+    def __init__(
+        self,
+        tx=None,
+        rx=None,
+        *,
+        baudrate=9600,
+        timeout=1,
+        receiver_buffer_size=64,
+        **kwargs,
+    ):
+        self.hardware = hardware.current()
+        self.device = self.hardware.triad
+        self.device.baudrate = baudrate
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.receiver_buffer_size = receiver_buffer_size
+        self.rx = bytearray()
+
+    def _receive(self, draining=False):
+        data = self.device.read_ready(self.hardware.clock.monotonic_ns())
+        self.rx += data
+        if not draining:
+            self._overflow()
+
+    def _overflow(self):
+        # Bytes beyond the receive buffer are lost, as on the real UART
+        del self.rx[self.receiver_buffer_size :]
+
+    def _wait(self, wanted):
+        # Block (in virtual time) for up to timeout seconds; a blocking read
+        # takes bytes out of the buffer as they arrive, so replies longer
+        # than the buffer are only cut short if they are left unread
+        deadline = self.hardware.clock.monotonic_ns() + int(self.timeout * 1e9)
+        self._receive()
+        while not wanted() and self.hardware.clock.monotonic_ns() < deadline:
+            self.hardware.checkpoint()
+            self._receive(draining=True)
+
+    @property
+    def in_waiting(self):
+        self._receive()
+        return len(self.rx)
+
+    def write(self, buf):
+        self.hardware.checkpoint()
+        self.device.receive(self.hardware.clock.monotonic_ns(), bytes(buf))
+        return len(buf)
+
+    def read(self, nbytes=None):
+        if nbytes is None:
+            self._receive()
+            nbytes = len(self.rx)
+        else:
+            self._wait(lambda: len(self.rx) >= nbytes)
+        data = bytes(self.rx[:nbytes])
+        del self.rx[:nbytes]
+        self._overflow()
+        return data or None
+
+    def readinto(self, buf):
+        self._wait(lambda: len(self.rx) > 0)
+        n = min(len(buf), len(self.rx))
+        buf[:n] = self.rx[:n]
+        del self.rx[:n]
+        self._overflow()
+        return n or None
+
+    def readline(self):
+        self._wait(lambda: b"\n" in self.rx)
+        end = self.rx.find(b"\n") + 1 or len(self.rx)
+        data = bytes(self.rx[:end])
+        del self.rx[:end]
+        self._overflow()
+        return data or None
+
+    def reset_input_buffer(self):
+        self._receive()
+        self.rx.clear()
+
+    def deinit(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.deinit()
@@ -0,0 +1,46 @@
+# countio.py
+# Simulated edge counter fed by the pulse train attached to its pin
+
+from sim import hardware
+
+
+class Edge:
+    RISE = 1
+    FALL = 2
+    RISE_AND_FALL = 3
+
+
+class Counter:
+    def __init__(self, pin, *, edge=Edge.FALL, pull=None):
+        self.hardware = hardware.current()
+        self.pin = pin
+        self.edge = edge
+        self.base = self._total()
+
+    def _total(self):
+        train = self.hardware.pulses.get(self.pin.name)
+        if train is None:
+            return 0
+        total = train.count_at(self.hardware.clock.monotonic_ns())
+        # A pulse has a rising and a falling edge
+        return total * 2 if self.edge == Edge.RISE_AND_FALL else total
+
+    @property
+    def count(self):
+        return self._total() - self.base
+
+    @count.setter
+    def count(self, value):
+        self.base = self._total() - value
+
+    def reset(self):
+        self.count = 0
+
+    def deinit(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.deinit()
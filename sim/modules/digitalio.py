@@ -0,0 +1,59 @@
+# digitalio.py
+# Simulated GPIO; inputs read the scripted level for their pin
+
+from sim import hardware
+
+
+class Direction:
+    INPUT = 0
+    OUTPUT = 1
+
+
+class Pull:
+    UP = 1
+    DOWN = 2
+
+
+class DriveMode:
+    PUSH_PULL = 0
+    OPEN_DRAIN = 1
+
+
+class DigitalInOut:
+    def __init__(self, pin):
+        self.hardware = hardware.current()
+        self.pin = pin
+        self.direction = Direction.INPUT
+        self.pull = None
+        self.drive_mode = DriveMode.PUSH_PULL
+        self.output = False
+
+    def switch_to_output(self, value=False, drive_mode=DriveMode.PUSH_PULL):
+        self.direction = Direction.OUTPUT
+        self.output = value
+
+    def switch_to_input(self, pull=None):
+        self.direction = Direction.INPUT
+        self.pull = pull
+
+    @property
+    def value(self):
+        self.hardware.checkpoint(1_000)
+        if self.direction == Direction.OUTPUT:
+            return self.output
+        source = self.hardware.pin_inputs.get(self.pin.name, self.pull == Pull.UP)
+        return bool(hardware.read_value(source, self.hardware.now_s()))
+
+    @value.setter
+    def value(self, value):
+        self.hardware.checkpoint(1_000)
+        self.output = bool(value)
+
+    def deinit(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.deinit()
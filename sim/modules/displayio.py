@@ -0,0 +1,63 @@
+# displayio.py
+# Simulated display objects; groups are plain lists of what they show
+
+from sim import hardware
+
+
+def release_displays():
+    hardware.current().displays.clear()
+
+
+class I2CDisplay:
+    def __init__(self, i2c_bus, *, device_address, reset=None):
+        self.i2c_bus = i2c_bus
+        self.device_address = device_address
+
+
+class Group(list):
+    def __init__(self, *, scale=1, x=0, y=0):
+        super().__init__()
+        self.scale = scale
+        self.x = x
+        self.y = y
+        self.hidden = False
+
+
+class Bitmap:
+    def __init__(self, width, height, value_count):
+        self.width = width
+        self.height = height
+        self.value_count = value_count
+
+
+class Palette(list):
+    def __init__(self, color_count):
+        super().__init__([0] * color_count)
+
+
+class TileGrid:
+    def __init__(self, bitmap, *, pixel_shader, x=0, y=0, **kwargs):
+        self.bitmap = bitmap
+        self.pixel_shader = pixel_shader
+        self.x = x
+        self.y = y
+
+
+class Display:
+    # Base for simulated display drivers; counts how often it is redrawn
+    def __init__(self, bus, *, width, height, auto_refresh=True, **kwargs):
+        self.hardware = hardware.current()
+        self.hardware.displays.append(self)
+        self.bus = bus
+        self.width = width
+        self.height = height
+        self.auto_refresh = auto_refresh
+        self.root_group = None
+        self.refreshes = 0
+        # Virtual time a full redraw takes over I2C
+        self.refresh_ns = 25_000_000
+
+    def refresh(self, *, target_frames_per_second=None, minimum_frames_per_second=0):
+        self.hardware.checkpoint(self.refresh_ns)
+        self.refreshes += 1
+        return True
@@ -0,0 +1,5 @@
+# micropython.py
+
+
+def const(value):
+    return value
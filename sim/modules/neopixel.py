@@ -0,0 +1,36 @@
+# neopixel.py
+# Simulated NeoPixel strip; remembers every color written to it
+
+from sim import hardware
+
+
+class NeoPixel(list):
+    def __init__(self, pin, n, *, brightness=1.0, auto_write=True, **kwargs):
+        super().__init__([(0, 0, 0)] * n)
+        self.hardware = hardware.current()
+        self.hardware.neopixels.append(self)
+        self.pin = pin
+        self.brightness = brightness
+        self.auto_write = auto_write
+        self.writes = []  # (time_ns, colors) of every update sent to the strip
+
+    def _write(self):
+        self.hardware.checkpoint(30_000 * len(self))
+        self.writes.append((self.hardware.clock.monotonic_ns(), list(self)))
+
+    def __setitem__(self, index, color):
+        super().__setitem__(index, tuple(color))
+        if self.auto_write:
+            self._write()
+
+    def fill(self, color):
+        for i in range(len(self)):
+            super().__setitem__(i, tuple(color))
+        if self.auto_write:
+            self._write()
+
+    def show(self):
+        self._write()
+
+    def deinit(self):
+        pass
@@ -0,0 +1,81 @@
+# rp2pio.py
+# Simulated PIO state machine running the Geiger firmware's arrival-time
+# program: x counts down from 0xFFFFFFFF at half the state machine clock and
+# is pushed to an 8 word (joined) RX FIFO on every falling edge of the pulse
+# train on jmp_pin. Edges that find the FIFO full are lost, as on the chip,
+# but still counted down in y, which run() can push once the machine stops.
+
+from sim import hardware
+
+FIFO_DEPTH = 8
+
+
+class StateMachine:
+    def __init__(self, program, frequency, *, init=None, jmp_pin=None, **kwargs):
+        self.hardware = hardware.current()
+        self.program = program
+        self.frequency = frequency
+        self.train = self.hardware.pulses.get(jmp_pin.name) if jmp_pin else None
+        self.start_ns = self.hardware.clock.monotonic_ns()
+        if self.train is not None:
+            # Only edges after the program starts are timestamped
+            self.train.count_at(self.start_ns)
+        self.fifo = []
+        self.lost = 0  # Edges dropped on a full FIFO, for inspection
+        self.y = 0xFFFFFFFF
+        self.isr = 0
+        self.running = True
+
+    def _update(self):
+        if self.train is None or not self.running:
+            return
+        for edge_ns in self.train.edges_until(self.hardware.clock.monotonic_ns()):
+            self.y = (self.y - 1) & 0xFFFFFFFF
+            if len(self.fifo) == FIFO_DEPTH:
+                self.lost += 1
+                continue
+            ticks = (edge_ns - self.start_ns) * self.frequency // 2_000_000_000
+            self.fifo.append(0xFFFFFFFF - (ticks & 0xFFFFFFFF))
+
+    @property
+    def in_waiting(self):
+        self._update()
+        return len(self.fifo)
+
+    def readinto(self, buffer, *, start=0, end=None, swap=False):
+        # Blocks until every word has arrived
+        end = len(buffer) if end is None else end
+        for i in range(start, end):
+            self._update()
+            while not self.fifo:
+                self.hardware.checkpoint()
+                self._update()
+            buffer[i] = self.fifo.pop(0)
+
+    def stop(self):
+        self._update()
+        self.running = False
+
+    def run(self, instructions):
+        # Only the instructions the firmware runs on the stopped machine
+        for line in instructions.text.splitlines():
+            line = line.partition(";")[0].strip()
+            if line == "in y, 32":
+                self.isr = self.y
+            elif line == "push":
+                if len(self.fifo) < FIFO_DEPTH:
+                    self.fifo.append(self.isr)
+            elif line:
+                raise NotImplementedError(f"simulated PIO can't run {line!r}")
+
+    def clear_rxfifo(self):
+        self.fifo.clear()
+
+    def deinit(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.deinit()
@@ -0,0 +1,22 @@
+# supervisor.py
+# Simulated supervisor: USB is always connected and ticks follow the clock
+
+from sim import hardware
+
+
+class _Runtime:
+    @property
+    def usb_connected(self):
+        return hardware.current().usb_data.connected
+
+    @property
+    def serial_connected(self):
+        return hardware.current().usb_console.connected
+
+
+runtime = _Runtime()
+
+
+def ticks_ms():
+    # Like CircuitPython, ticks wrap around every 2**29 ms
+    return (hardware.current().clock.monotonic_ns() // 1_000_000) & (2**29 - 1)
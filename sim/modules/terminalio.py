@@ -0,0 +1,10 @@
+# terminalio.py
+# Simulated built-in font
+
+
+class _Font:
+    def get_bounding_box(self):
+        return (6, 12)
+
+
+FONT = _Font()
@@ -0,0 +1,76 @@
+# usb_cdc.py
+# Simulated USB serial ports; the host side is hardware.current().usb_data
+
+from sim import hardware
+from sim.clock import FirmwareExit
+
+
+class Serial:
+    def __init__(self, port):
+        self.port = port
+
+    @property
+    def timeout(self):
+        return self.port.timeout
+
+    @timeout.setter
+    def timeout(self, value):
+        self.port.timeout = value
+
+    @property
+    def in_waiting(self):
+        return len(self.port.input)
+
+    @property
+    def connected(self):
+        return self.port.connected
+
+    def _take(self, n):
+        data = bytes(self.port.input[:n])
+        del self.port.input[:n]
+        return data
+
+    def read(self, size=1):
+        if not self.port.input:
+            # Nothing more will ever arrive from the host
+            raise FirmwareExit("host has no more input")
+        return self._take(size)
+
+    def readinto(self, buf):
+        data = self.read(len(buf))
+        buf[: len(data)] = data
+        return len(data)
+
+    def readline(self, size=-1):
+        if not self.port.input:
+            raise FirmwareExit("host has no more input")
+        end = self.port.input.find(b"\n") + 1 or len(self.port.input)
+        if size >= 0:
+            end = min(end, size)
+        return self._take(end)
+
+    def write(self, buf):
+        hardware.current().checkpoint(len(buf) * 1_000)
+        self.port.output += bytes(buf)
+        return len(buf)
+
+    def flush(self):
+        pass
+
+    def reset_input_buffer(self):
+        self.port.input.clear()
+
+    def reset_output_buffer(self):
+        pass
+
+
+def __getattr__(name):
+    if name == "data":
+        return Serial(hardware.current().usb_data)
+    if name == "console":
+        return Serial(hardware.current().usb_console)
+    raise AttributeError(name)
+
+
+def enable(*, console=True, data=False):
+    pass
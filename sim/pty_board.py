@@ -0,0 +1,122 @@
+# pty_board.py
+# Pseudo-terminals that behave like boards' USB data ports, each answered by
+# a firmware's code.py running on the simulated hardware (POSIX only)
+#
+#   python -m sim.pty_board "Lab 09 - Magnetometer/code.py" --boards 3
+#
+# prints one port path per board for the host scripts to open. Board n sees
+# a field of 50 * (n + 1) uT along z unless --field is given.
+
+import argparse
+import contextlib
+import os
+import selectors
+import sys
+import tty
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import sim  # noqa: E402
+
+
+class PtyBoard:
+    def __init__(self, firmware_path, setup=None):
+        self.firmware_path = firmware_path
+        # Called with the fresh hardware state before every request
+        self.setup = setup
+        self.master, slave = os.openpty()
+        # Raw mode so binary frames pass through the terminal unchanged
+        tty.setraw(slave)
+        self.port = os.ttyname(slave)
+        self.slave = slave
+        self.input = bytearray()
+        self.runs = 0
+
+    def receive(self):
+        # Returns False once the host side can no longer be read
+        try:
+            data = os.read(self.master, 4096)
+        except OSError:
+            return False
+        if not data:
+            return False
+        self.input += data
+        while b"\n" in self.input:
+            line, _, rest = bytes(self.input).partition(b"\n")
+            self.input = bytearray(rest)
+            self.respond(line + b"\n")
+        return True
+
+    def respond(self, line):
+        # Run the firmware on fresh hardware until it waits for more input
+        hw = sim.reset()
+        # Fresh sensor noise for every run
+        self.runs += 1
+        hw.mlx90393.random.seed(self.runs)
+        if self.setup:
+            self.setup(hw)
+        hw.usb_data.feed(line)
+        # Keep the firmware's console output off stdout, which lists the ports
+        with contextlib.redirect_stdout(sys.stderr):
+            sim.load_firmware(self.firmware_path)
+        output = memoryview(hw.usb_data.take_output())
+        while output:
+            written = os.write(self.master, output)
+            output = output[written:]
+
+    def close(self):
+        if self.master is None:
+            return
+        os.close(self.master)
+        os.close(self.slave)
+        self.master = self.slave = None
+
+
+def serve(boards):
+    selector = selectors.DefaultSelector()
+    for board in boards:
+        selector.register(board.master, selectors.EVENT_READ, board)
+    try:
+        while selector.get_map():
+            for key, _ in selector.select():
+                board = key.data
+                if not board.receive():
+                    # Stop watching a port that can no longer be read, or
+                    # select() would keep reporting it ready
+                    print(f"{board.port}: closed", file=sys.stderr)
+                    selector.unregister(key.fileobj)
+                    board.close()
+    finally:
+        for board in boards:
+            board.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve simulated boards on ptys")
+    parser.add_argument("firmware", type=Path, help="code.py to run")
+    parser.add_argument("--boards", type=int, default=1)
+    parser.add_argument(
+        "--field", type=float, help="magnetometer field along z in uT for every board"
+    )
+    args = parser.parse_args()
+
+    boards = []
+    for n in range(args.boards):
+        field = args.field if args.field is not None else 50.0 * (n + 1)
+
+        def setup(hw, field=field):
+            hw.mlx90393.field_ut = (0.0, 0.0, field)
+
+        boards.append(PtyBoard(args.firmware, setup))
+    for board in boards:
+        print(board.port, flush=True)
+    try:
+        serve(boards)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# pulses.py
+# Pulse trains that feed the simulated countio.Counter (e.g. a Geiger tube)
+# Each train hands out its falling edges in time order as the clock advances
+
+import random
+
+
+class PulseTrain:
+    def __init__(self):
+        self.count = 0  # Edges up to and including next_ns - 1
+        self.next_ns = None
+
+    def next_interval_ns(self):
+        # Time from one edge to the next
+        raise NotImplementedError
+
+    def start(self):
+        if self.next_ns is None:
+            self.next_ns = self.next_interval_ns()
+
+    def count_at(self, t_ns):
+        # Total number of edges from time 0 up to and including t_ns
+        self.start()
+        while self.next_ns is not None and self.next_ns <= t_ns:
+            self.count += 1
+            interval = self.next_interval_ns()
+            self.next_ns = None if interval is None else self.next_ns + interval
+        return self.count
+
+    def edges_until(self, t_ns):
+        # Times of the edges after the last call (or count_at) up to t_ns
+        self.start()
+        edges = []
+        while self.next_ns is not None and self.next_ns <= t_ns:
+            edges.append(self.next_ns)
+            self.count += 1
+            interval = self.next_interval_ns()
+            self.next_ns = None if interval is None else self.next_ns + interval
+        return edges
+
+
+class PoissonPulses(PulseTrain):
+    # Random decays at rate_hz as seen by a non-paralyzable detector that
+    # is blind for dead_time seconds after every pulse it records
+    def __init__(self, rate_hz, dead_time=0.0, seed=None):
+        super().__init__()
+        self.rate_hz = rate_hz
+        self.dead_time = dead_time
+        self.random = random.Random(seed)
+
+    def next_interval_ns(self):
+        if self.rate_hz <= 0:
+            return None
+        interval = self.dead_time + self.random.expovariate(self.rate_hz)
+        return max(1, int(interval * 1_000_000_000))
+
+
+class PeriodicPulses(PulseTrain):
+    # Evenly spaced pulses, handy for checking counts exactly
+    def __init__(self, rate_hz):
+        super().__init__()
+        self.rate_hz = rate_hz
+
+    def next_interval_ns(self):
+        if self.rate_hz <= 0:
+            return None
+        return max(1, int(1_000_000_000 / self.rate_hz))
+
+
+class PulseTimes(PulseTrain):
+    # Pulses at a fixed list of increasing times (in seconds)
+    def __init__(self, times):
+        super().__init__()
+        self.times_ns = [int(t * 1_000_000_000) for t in times]
+        self.index = 0
+
+    def next_interval_ns(self):
+        if self.index >= len(self.times_ns):
+            return None
+        previous = self.times_ns[self.index - 1] if self.index else 0
+        interval = self.times_ns[self.index] - previous
+        self.index += 1
+        return interval
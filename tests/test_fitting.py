@@ -0,0 +1,35 @@
+# test_fitting.py
+# Batched polynomial fits against np.polyfit
+
+import numpy as np
+
+from analysis import fit_at, polyfit
+
+NAN = np.nan
+
+
+def test_matches_np_polyfit():
+    x = np.arange(7) * 8
+    y = np.array([357, 244, 171, 118, 71, 53, 35])
+    fit = polyfit(x, y, 2)
+    np.testing.assert_allclose(fit.coeffs, np.polyfit(x, y, 2))
+    assert fit.dof == 4
+
+
+def test_nan_padding():
+    x = [[1, 2, 3, 4, 5], [1, 2, 3, 4, NAN]]
+    y = [[2, 5, 10, 17, 26], [3, 5, 9, 15, NAN]]
+    fit = polyfit(x, y, 2)
+    np.testing.assert_allclose(fit_at(fit, 0).coeffs, [1, 0, 1], atol=1e-12)
+    np.testing.assert_allclose(fit_at(fit, 1).coeffs, [1, -1, 3], atol=1e-12)
+    np.testing.assert_array_equal(fit.dof, [2, 1])
+
+
+def test_too_few_points_only_spoil_their_own_fit():
+    x = [[1, 2, 3, 4], [1, 2, NAN, NAN], [5, 5, 5, 5], [NAN] * 4]
+    y = [[1, 4, 9, 16], [1, 2, NAN, NAN], [1, 2, 3, 4], [NAN] * 4]
+    fit = polyfit(x, y, 2)
+    np.testing.assert_allclose(fit.coeffs[0], [1, 0, 0], atol=1e-12)
+    assert fit.r2[0] == 1
+    for values in (fit.coeffs[1:], fit.stderr[1:], fit.r2[1:]):
+        assert np.all(np.isnan(values))
@@ -0,0 +1,84 @@
+# test_sim.py
+# Drive the lab firmware through the simulator, as the README shows
+#
+#   python -m pytest tests
+
+import asyncio
+import io
+from pathlib import Path
+
+import numpy as np
+
+import sim
+from analysis import read_run
+from sim.geiger import GeigerPulses
+
+REPO = Path(__file__).resolve().parent.parent
+GEIGER = REPO / "Lab 12 - Geiger Counter" / "code.py"
+
+
+def load_geiger(rate_hz):
+    hw = sim.reset()
+    hw.pulses["A1"] = sim.PeriodicPulses(rate_hz)
+    firmware = sim.load_firmware(GEIGER)
+    firmware.init_screen()
+    return hw, firmware
+
+
+def test_run_returns_when_nothing_else_is_running():
+    sim.reset()
+    assert sim.run(asyncio.sleep(1, result="done")) == "done"
+    assert sim.current().clock.monotonic() == 1
+
+
+def test_count_decay_events_runs_to_completion():
+    hw, firmware = load_geiger(10)
+    snapshots = sim.run(firmware.count_decay_events(2, 3))
+    assert firmware.interval_counts(snapshots) == [30, 30]
+    assert hw.display_text()[2] == "Avg Count = 30"
+
+
+def test_run_stops_after_seconds():
+    _, firmware = load_geiger(10)
+    assert sim.run(firmware.count_decay_events(2, 3), seconds=4) is None
+
+
+def test_adaptive_count_lines_fit_the_display():
+    # The OLED shows 21 characters per line
+    _, firmware = load_geiger(10)
+    for n in range(1, 20_000):
+        assert len(firmware.precision_text(n, firmware.ADAPTIVE_TARGET)) <= 21
+        for seconds in (1, 10, 300):
+            rate, error = n / seconds, n**0.5 / seconds
+            assert len(firmware.rate_text(rate, error)) <= 21
+    for error in (0.0, 9.95, 99.9, 99.96, 9999.4):
+        assert len(firmware.done_text(error)) <= 21
+
+
+def test_capture_reports_pulses_it_could_not_timestamp():
+    hw = sim.reset()
+    hw.pulses["A1"] = GeigerPulses(2000, seed=1)
+    firmware = sim.load_firmware(GEIGER)
+    firmware.init_screen()
+
+    async def capture():
+        asyncio.create_task(firmware.poll_buttons())
+        task = asyncio.create_task(firmware.capture_arrivals())
+        await asyncio.sleep(2)
+        hw.joystick.press(firmware.BUTTON_LEFT)  # Y to stop
+        await asyncio.sleep(0.1)
+        hw.joystick.release(firmware.BUTTON_LEFT)
+        await asyncio.sleep(0.1)
+        return task
+
+    task = sim.run(capture())
+    assert task.cancelled()  # Still showing the totals when the run ended
+    values = read_run(io.BytesIO(hw.usb_data.take_output()), np.dtype("<u4"))
+    timestamps, pulses = values[:-1], int(values[-1])
+    # The rate is far too high for the 8 word FIFO, but every pulse is counted
+    assert 0 < len(timestamps) < pulses
+    assert abs(pulses - 2 * 2000 / 1.2) < 200
+    assert hw.display_text()[1:3] == [
+        f"{len(timestamps):,} captured",
+        f"{pulses - len(timestamps):,} lost",
+    ]